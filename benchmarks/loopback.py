@@ -0,0 +1,123 @@
+# Loopback check of the game server: python -m benchmarks.loopback [--games N]
+# Plays random games through Client connections against a GameServer on a free local port, covering
+# create/join/move/over, the error replies and room cleanup, then reports the move throughput.
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from src.logic.core.state import TAIL, GameState
+from src.logic.net import protocol
+from src.logic.net.client import Client
+from src.logic.net.server import GameServer
+
+
+def check(condition: bool, message: str) -> None:
+    if not condition:
+        raise AssertionError(message)
+
+
+async def expect_error(client: Client, code: int) -> None:
+    try:
+        await client.receive()
+    except protocol.ProtocolError as error:
+        check(error.args[0] == code, f"expected error {code}, got {error.args[0]}")
+    else:
+        raise AssertionError(f"expected error {code}")
+
+
+async def check_errors(port: int) -> None:
+    first = await Client.connect(port=port)
+    await first.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(0))
+    await expect_error(first, protocol.NOT_SEATED)
+    await first.send(protocol.JOIN, protocol.JOIN_PAYLOAD.pack(10**9))
+    await expect_error(first, protocol.UNKNOWN_GAME)
+    await first.send(protocol.CREATE, protocol.CREATE_PAYLOAD.pack(0, 4, 2, 0.05, 1))
+    await expect_error(first, protocol.BAD_MESSAGE)
+
+    await first.create(4, 4, players=2, seed=1)
+    second = await Client.connect(port=port)
+    await second.join(first.game_id)
+    third = await Client.connect(port=port)
+    await third.send(protocol.JOIN, protocol.JOIN_PAYLOAD.pack(first.game_id))
+    await expect_error(third, protocol.GAME_FULL)
+
+    await second.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(first.state.move_code(first.state.legal_moves()[0])))
+    await expect_error(second, protocol.NOT_YOUR_TURN)
+    illegal = next(code for code in range(16) if first.state.move_from_code(code) not in first.state.legal_moves())
+    await first.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(illegal))
+    await expect_error(first, protocol.ILLEGAL_MOVE)
+
+    # while both ends share the anchor a tail move is accepted as the head move legal_moves() offers
+    anchor = first.state.head_cell
+    head_move = first.state.legal_moves()[0]
+    await first.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(first.state.move_code(head_move | TAIL)))
+    kind, payload = await first.receive()
+    check(kind == protocol.MOVED and not protocol.MOVED_PAYLOAD.unpack(payload)[1] >> 3 & TAIL, "tail move stored")
+    check((first.state.head_cell, first.state.tail_cell) == (head_move >> 1, anchor), "moved the wrong end")
+    for client in (first, second, third):
+        await client.close()
+
+
+async def play(port: int, seed: int, stats: dict) -> None:
+    host = await Client.connect(port=port)
+    await host.create(6, 6, players=2, seed=seed)
+    guest = await Client.connect(port=port)
+    await guest.join(host.game_id)
+    clients = [host, guest]
+    expected = GameState.random(6, 6, players=2, rng=random.Random(seed))
+    check(host.state.walls == expected.walls, "the seed does not reproduce the board")
+
+    rng = random.Random(seed)
+    while host.loser is None:
+        mover = clients[host.state.current_player]
+        await mover.move(rng.choice(mover.state.legal_moves()))
+        for client in clients:
+            kind, _ = await client.receive()
+            check(kind == protocol.MOVED, f"expected a move broadcast, got {kind}")
+            if client.state.is_over:
+                kind, _ = await client.receive()
+                check(kind == protocol.OVER, f"expected the game over message, got {kind}")
+        stats["moves"] += 1
+
+    check(host.state.connected == guest.state.connected, "the clients disagree on the position")
+    check(host.loser == guest.loser == host.state.current_player, "wrong loser")
+    for client in clients:
+        await client.close()
+
+
+async def run(games: int) -> None:
+    server = GameServer()
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+    await check_errors(port)
+
+    stats = {"moves": 0}
+    started = time.perf_counter()
+    await asyncio.gather(*(play(port, seed, stats) for seed in range(games)))
+    elapsed = time.perf_counter() - started
+
+    # the server notices the closed connections on its next read
+    for _ in range(100):
+        if not server.rooms:
+            break
+        await asyncio.sleep(0.01)
+    check(not server.rooms, f"{len(server.rooms)} rooms left after every client disconnected")
+    listener.close()
+    await listener.wait_closed()
+    print(f"{games} games, {stats['moves']} moves in {elapsed:.2f}s = {stats['moves'] / elapsed:,.0f} moves/s")
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Play games against a local GameServer and check the protocol.")
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args.games))
+    except AssertionError as error:
+        sys.exit(f"loopback check failed: {error}")
+
+
+if __name__ == "__main__":
+    main()
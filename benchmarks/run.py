@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+# must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame  # noqa: E402
+
+from src.logic.core.board import Board  # noqa: E402
+from src.logic.core.state import GameState  # noqa: E402
+
+DEFAULT_SIZES = [4, 10, 30, 100, 200]
+SURFACE_SIZE = (600, 800)
+
+
+def measure(fn, repeat: int) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"seconds": statistics.median(times), "best": min(times), "calls": number * repeat}
+
+
+def bench_size(size: int, seed: int, repeat: int, surface: pygame.Surface) -> list[dict]:
+    def _run(name: str, fn) -> dict:
+        result = {"benchmark": name, "size": f"{size}x{size}", **measure(fn, repeat)}
+        print(f"{name:<28} {size:>4}x{size:<4} {result['seconds'] * 1e6:>14,.2f} us", file=sys.stderr)
+        return result
+
+    state = GameState.random(size, size, rng=random.Random(seed))
+    board = Board(height=size, width=size, surface=surface, seed=seed)
+    board.draw()
+
+    def _board_game():
+        board.random_simulation()
+        board.reset()
+
+    def _redraw():
+        board.relayout()
+        board.draw()
+
+    return [
+        _run("state_init", lambda: GameState.random(size, size, rng=random.Random(seed))),
+        _run("state_random_simulation", lambda: state.copy().random_simulation(rng=random.Random(seed))),
+        _run("board_init", lambda: Board(height=size, width=size, surface=surface, seed=seed)),
+        _run("board_flush", board.flush),
+        _run("possible_connections", board.possible_connections),
+        _run("available_moves", lambda: board.state.available_moves()),
+        _run("available_moves_cached", board.available_moves),
+        _run("board_random_simulation", _board_game),
+        _run("board_draw", board.draw),
+        _run("board_draw_full", _redraw),
+    ]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path) as baseline_file:
+        baseline = {(row["benchmark"], row["size"]): row["seconds"] for row in json.load(baseline_file)["results"]}
+    for row in results:
+        before = baseline.get((row["benchmark"], row["size"]))
+        if before:
+            change = row["seconds"] / before - 1
+            print(f"{row['benchmark']:<28} {row['size']:>9} {change:>+8.1%}", file=sys.stderr)
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark move generation, simulation and rendering. Run from the repo root: "
+        "python -m benchmarks.run --out bench.json --compare previous.json"
+    )
+    parser.add_argument("--sizes", type=lambda s: [int(v) for v in s.split(",")], default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default="-", help="JSON output file, '-' for stdout")
+    parser.add_argument("--compare", help="previous JSON output to compare against")
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+    surface = pygame.display.set_mode(SURFACE_SIZE)
+
+    results = []
+    for size in args.sizes:
+        results += bench_size(size, args.seed, args.repeat, surface)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.out == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.out, "w") as out:
+            json.dump(report, out, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
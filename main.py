@@ -1,20 +1,73 @@
-# from src.models.board import Board
-from src.logic.core.board import Board
-from src.logic.core.utils import Point
-from src.logic.ui.menus import Game
+import time
 
+STARTED = time.perf_counter()
 
+import os  # noqa: E402
+import sys  # noqa: E402
+
+# keep stdout clean for `main.py selfplay` streaming JSONL/CSV
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+# each entry point imports only what it runs, so the headless ones never load the UI
 def main():
-    board = Board(width=3, height=3, start_anchor=Point(0, 0))
-    board.display_as_text()
-    board.possible_connections()
+    from src.logic.core.state import GameState
+    from src.logic.core.utils import Point
+
+    state = GameState(width=3, height=3, anchor=Point(0, 0))
+    state.display_as_text()
+    print(state.possible_connections())
 
 
 def pygame_main():
-    game = Game()
+    from src.logic.ui.menus import Game
+
+    game = Game(started=STARTED)
+    game.mainloop()
+
+
+def replay_main():
+    from src.logic.core.record import read_records
+    from src.logic.ui.menus import Game
+
+    # main.py replay <file> [index]: open the index-th game of a record file
+    path, index = sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    with open(path, "rb") as stream:
+        record = next((record for i, record in enumerate(read_records(stream)) if i == index), None)
+    if record is None:
+        sys.exit(f"no game {index} in {path}")
+    game = Game(started=STARTED)
+    game.load_record(record)
     game.mainloop()
 
 
+def selfplay_main():
+    from src.logic.sim.selfplay import cli as selfplay_cli
+
+    selfplay_cli(sys.argv[2:])
+
+
+def solver_main():
+    from src.logic.ai.solver import cli as solver_cli
+
+    solver_cli(sys.argv[2:])
+
+
+def server_main():
+    from src.logic.net.server import cli as server_cli
+
+    server_cli(sys.argv[2:])
+
+
 if __name__ == "__main__":
-    pygame_main()
+    if sys.argv[1:2] == ["selfplay"]:
+        selfplay_main()
+    elif sys.argv[1:2] == ["solve"]:
+        solver_main()
+    elif sys.argv[1:2] == ["replay"]:
+        replay_main()
+    elif sys.argv[1:2] == ["serve"]:
+        server_main()
+    else:
+        pygame_main()
     # main()
@@ -0,0 +1,57 @@
+import sqlite3
+from dataclasses import dataclass
+
+from src.logic.core.state import GameState
+from src.logic.core.symmetry import canonical, restore_move, transform_move
+
+
+@dataclass(frozen=True, slots=True)
+class BookEntry:
+    win: bool  # for the player to move
+    best_move: int | None  # a winning move, None for a lost position
+    nodes: int  # search nodes spent on it
+
+
+class OpeningBook:
+    """Solved positions in an SQLite file, keyed by canonical form so one entry covers every symmetric image."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS positions "
+            "(key BLOB PRIMARY KEY, win INTEGER NOT NULL, move INTEGER, nodes INTEGER NOT NULL)"
+        )
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def lookup(self, state: GameState) -> BookEntry | None:
+        key, symmetry = canonical(state)
+        self.probes += 1
+        row = self.db.execute("SELECT win, move, nodes FROM positions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        win, move, nodes = row
+        return BookEntry(bool(win), None if move is None else restore_move(move, symmetry), nodes)
+
+    def store(self, state: GameState, win: bool, best_move: int = None, nodes: int = 0) -> None:
+        key, symmetry = canonical(state)
+        move = None if best_move is None else transform_move(best_move, symmetry)
+        self.db.execute("INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?)", (key, win, move, nodes))
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
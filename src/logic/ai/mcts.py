@@ -0,0 +1,133 @@
+import math
+import random
+import time
+
+from src.logic.ai.book import OpeningBook
+from src.logic.core.analysis import decided_loser
+from src.logic.core.state import GameState
+from src.logic.core.utils import Connectivity
+
+
+class TreeNode:
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "wins")
+
+    def __init__(
+        self,
+        state: GameState,
+        rng: random.Random,
+        move: int = None,
+        parent: "TreeNode" = None,
+        player: int = None,
+    ):
+        self.move = move
+        self.parent = parent
+        self.player = player  # the player who made `move`
+        self.children: list[TreeNode] = []
+        self.untried = state.legal_moves()
+        rng.shuffle(self.untried)
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration: float) -> "TreeNode":
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+
+class MCTSPlayer:
+    """UCT search over head/tail moves, spending at most ``budget_ms`` per decision."""
+
+    def __init__(
+        self,
+        budget_ms: int = 500,
+        exploration: float = math.sqrt(2),
+        heavy_playouts: bool = False,
+        max_iterations: int = None,
+        seed: int = None,
+        book: OpeningBook = None,
+    ):
+        self.rng = random.Random(seed)
+        self.book = book
+        self.budget_ms = budget_ms
+        self.exploration = exploration
+        self.heavy_playouts = heavy_playouts
+        self.max_iterations = max_iterations
+        self.last_playouts = 0
+        self.last_elapsed = 0.0
+
+    @property
+    def playouts_per_second(self) -> float:
+        return self.last_playouts / self.last_elapsed if self.last_elapsed else 0.0
+
+    def choose(self, state: GameState) -> Connectivity | None:
+        move = self.search(state)
+        return state.connectivity(move) if move is not None else None
+
+    def search(self, state: GameState) -> int | None:
+        root = TreeNode(state, self.rng)
+        if not root.untried:
+            return None
+        if len(root.untried) == 1:
+            return root.untried[0]
+        # a solved win needs no search; a solved loss is still searched for the move most likely to go wrong
+        entry = self.book.lookup(state) if self.book is not None else None
+        if entry and entry.win:
+            self.last_playouts, self.last_elapsed = 0, 0.0
+            return entry.best_move
+
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+        iterations = 0
+        while time.perf_counter() < deadline and iterations != self.max_iterations:
+            self.iterate(root, state.copy())
+            iterations += 1
+
+        self.last_playouts = iterations
+        self.last_elapsed = time.perf_counter() - started
+        if not root.children:
+            # no iteration fitted in the budget: the untried moves are already shuffled
+            return root.untried[0]
+        return max(root.children, key=lambda child: child.visits).move
+
+    def iterate(self, root: TreeNode, state: GameState) -> None:
+        node = root
+        while not node.untried and node.children:
+            node = node.select(self.exploration)
+            state.apply_move(node.move)
+
+        if node.untried:
+            move = node.untried.pop()
+            player = state.current_player
+            state.apply_move(move)
+            child = TreeNode(state, self.rng, move=move, parent=node, player=player)
+            node.children.append(child)
+            node = child
+
+        loser = self.playout(state)
+        while node:
+            node.visits += 1
+            if node.player is not None and node.player != loser:
+                node.wins += 1
+            node = node.parent
+
+    def playout(self, state: GameState) -> int:
+        while moves := state.legal_moves():
+            state.apply_move(self.heavy_move(state, moves) if self.heavy_playouts else self.rng.choice(moves))
+        return state.current_player
+
+    def heavy_move(self, state: GameState, moves: list[int]) -> int:
+        # take a move after which somebody else is bound to lose (the next player stuck, or a single cell left
+        # for the next player to take), otherwise play at random among the moves that do not doom the mover
+        player = state.current_player
+        open_moves = []
+        for move in moves:
+            after = state.copy()
+            after.apply_move(move)
+            loser = decided_loser(after)
+            if loser is None:
+                open_moves.append(move)
+            elif loser != player:
+                return move
+        return self.rng.choice(open_moves or moves)
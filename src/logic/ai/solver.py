@@ -0,0 +1,225 @@
+import argparse
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from src.logic.ai.book import OpeningBook
+from src.logic.core.analysis import decided_loser, dilate
+from src.logic.core.state import GameState, iter_bits
+
+
+@dataclass
+class ZobristKeys:
+    walls: list[int]
+    connected: list[int]
+    planes: list[list[int]]
+    head: list[int]
+    tail: list[int]
+    player: list[int]
+    root: list[int]
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width: int, height: int, players: int) -> ZobristKeys:
+    rng = random.Random(f"zobrist-{width}x{height}-{players}")
+    cells = width * height
+
+    def _keys(count: int) -> list[int]:
+        return [rng.getrandbits(64) for _ in range(count)]
+
+    return ZobristKeys(
+        walls=_keys(cells),
+        connected=_keys(cells),
+        planes=[_keys(cells) for _ in range(4)],
+        head=_keys(cells),
+        tail=_keys(cells),
+        player=_keys(players),
+        root=_keys(players),
+    )
+
+
+def zobrist_hash(state: GameState) -> int:
+    keys = zobrist_keys(state.width, state.height, state.players)
+    value = keys.head[state.head_cell] ^ keys.tail[state.tail_cell] ^ keys.player[state.current_player]
+    for cell in iter_bits(state.walls):
+        value ^= keys.walls[cell]
+    for cell in iter_bits(state.connected):
+        value ^= keys.connected[cell]
+    for plane, bits in enumerate(state.planes):
+        for cell in iter_bits(bits):
+            value ^= keys.planes[plane][cell]
+    return value
+
+
+def zobrist_move(keys: ZobristKeys, state: GameState, record: tuple, player: int) -> int:
+    from_head, start, end = record[:3]
+    plane, bit = state.edge(start, end)
+    ends = keys.head if from_head else keys.tail
+    return (
+        keys.connected[end]
+        ^ keys.planes[plane][bit]
+        ^ ends[start]
+        ^ ends[end]
+        ^ keys.player[player]
+        ^ keys.player[state.current_player]
+    )
+
+
+@dataclass
+class SolveResult:
+    win: bool
+    best_move: int | None
+    nodes: int
+    elapsed: float
+    tt_probes: int
+    tt_hits: int
+    book_hits: int = 0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+
+class Solver:
+    """Exact alpha-beta search: can the player to move force the game to end on somebody else's turn?
+
+    With more than two players the others are assumed to cooperate against the player to move.
+    Solved roots are kept in ``book`` when given, and with two players so are the positions of the first
+    ``book_plies`` plies of a game, where symmetric openings meet most often.
+    """
+
+    def __init__(self, tt_size: int = 500_000, book: OpeningBook = None, book_plies: int = 4):
+        self.tt_size = tt_size
+        self.book = book
+        self.book_plies = book_plies
+        self.table: OrderedDict[int, bool] = OrderedDict()
+        self.keys: ZobristKeys = None
+        self.root_player = 0
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.book_hits = 0
+
+    def solve(self, state: GameState) -> SolveResult:
+        state = state.copy()
+        self.nodes = self.tt_probes = self.tt_hits = self.book_hits = 0
+        self.keys = zobrist_keys(state.width, state.height, state.players)
+        self.root_player = state.current_player
+
+        started = time.perf_counter()
+        entry = self.book.lookup(state) if self.book is not None else None
+        if entry:
+            return SolveResult(entry.win, entry.best_move, 0, time.perf_counter() - started, 0, 0, book_hits=1)
+        root_hash = zobrist_hash(state) ^ self.keys.root[self.root_player]
+        best_move = None
+        win = False
+        self.nodes += 1
+        for move in self.ordered_moves(state):
+            player = state.current_player
+            record = state.apply_move(move)
+            win = self.search(state, root_hash ^ zobrist_move(self.keys, state, record, player))
+            state.undo_move(record)
+            if win:
+                best_move = move
+                break
+
+        if self.book is not None:
+            self.book.store(state, win, best_move, self.nodes)
+            self.book.commit()
+        return SolveResult(
+            win=win,
+            best_move=best_move,
+            nodes=self.nodes,
+            elapsed=time.perf_counter() - started,
+            tt_probes=self.tt_probes,
+            tt_hits=self.tt_hits,
+            book_hits=self.book_hits,
+        )
+
+    def ordered_moves(self, state: GameState) -> list[int]:
+        # fewest empty neighbours first (one step of the analysis flood fill): cramped moves settle the game sooner
+        empty = state.empty
+
+        def exits(move: int) -> int:
+            return (dilate(1 << (move >> 1), state.width, state.height) & empty).bit_count()
+
+        return sorted(state.legal_moves(), key=exits)
+
+    def search(self, state: GameState, key: int) -> bool:
+        # True when the root player wins from this position
+        self.nodes += 1
+        self.tt_probes += 1
+        if key in self.table:
+            self.tt_hits += 1
+            self.table.move_to_end(key)
+            return self.table[key]
+
+        loser = decided_loser(state)
+        if loser is not None:
+            return loser != self.root_player
+
+        # the book is for the player to move, which with two players is the root player or its only opponent
+        maximizing = state.current_player == self.root_player
+        in_book = self.book is not None and state.players == 2 and state.ply <= self.book_plies
+        if in_book and (entry := self.book.lookup(state)):
+            self.book_hits += 1
+            return entry.win == maximizing
+
+        nodes = self.nodes
+        player = state.current_player
+        value = not maximizing  # no moves left: the player to move loses
+        best_move = None
+        for move in self.ordered_moves(state):
+            record = state.apply_move(move)
+            child = self.search(state, key ^ zobrist_move(self.keys, state, record, player))
+            state.undo_move(record)
+            if child == maximizing:
+                value = child
+                best_move = move
+                break
+
+        if in_book:
+            self.book.store(state, best_move is not None, best_move, self.nodes - nodes)
+        self.table[key] = value
+        if len(self.table) > self.tt_size:
+            self.table.popitem(last=False)
+        return value
+
+
+def cli(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Solve random boards exactly and report search statistics.")
+    parser.add_argument("--width", type=int, default=4)
+    parser.add_argument("--height", type=int, default=4)
+    parser.add_argument("--wall-density", type=float, default=0.05)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--boards", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tt-size", type=int, default=500_000)
+    parser.add_argument("--book", help="SQLite opening book to consult and extend")
+    parser.add_argument("--book-plies", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    book = OpeningBook(args.book) if args.book else None
+    solver = Solver(tt_size=args.tt_size, book=book, book_plies=args.book_plies)
+    for _ in range(args.boards):
+        state = GameState.random(
+            args.width, args.height, wall_density=args.wall_density, players=args.players, rng=rng
+        )
+        result = solver.solve(state)
+        print(
+            f"anchor={state.anchor} walls={bin(state.walls).count('1')} "
+            f"{'win' if result.win else 'loss'} for player {state.current_player + 1} "
+            f"move={state.connectivity(result.best_move) if result.win else None} "
+            f"nodes={result.nodes} {result.nodes_per_second:,.0f} nodes/s "
+            f"tt hit rate={result.tt_hit_rate:.1%} book hits={result.book_hits}"
+        )
+    if book is not None:
+        print(f"book: {len(book)} positions")
+        book.close()
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+from src.logic.core.state import GameState, board_masks
+
+# Reachability is a flood fill over bitboards: one dilation moves every frontier cell to all eight
+# neighbours at once with a few shifts, so a fill costs one pass per step of the region's diameter
+# rather than one per cell. Links only block diagonal steps and the flood ignores them, which makes
+# every reach an over-approximation and every bound derived from it a safe upper bound.
+
+
+def dilate(mask: int, width: int, height: int) -> int:
+    full, not_left, not_right = board_masks(width, height)
+    row = mask | (mask << 1) & not_left | (mask >> 1) & not_right
+    return (row | row << width | row >> width) & full
+
+
+def flood(seeds: int, free: int, width: int, height: int) -> int:
+    """Cells of ``free`` connected to ``seeds`` through ``free`` cells."""
+    reached = seeds & free
+    while True:
+        grown = dilate(reached, width, height) & free
+        if grown == reached:
+            return reached
+        reached = grown
+
+
+def regions(free: int, width: int, height: int) -> list[int]:
+    found = []
+    while free:
+        region = flood(free & -free, free, width, height)
+        found.append(region)
+        free &= ~region
+    return found
+
+
+@dataclass(frozen=True, slots=True)
+class Reach:
+    head: int
+    tail: int
+
+    @property
+    def cells(self) -> int:
+        return self.head | self.tail
+
+    @property
+    def move_bound(self) -> int:
+        # every move connects one empty cell and can only reach cells the flood reached
+        return self.cells.bit_count()
+
+
+def reach(state: GameState) -> Reach:
+    empty = state.empty
+    return Reach(
+        flood(state.head_targets, empty, state.width, state.height),
+        flood(state.tail_targets, empty, state.width, state.height),
+    )
+
+
+def decided_loser(state: GameState) -> int | None:
+    """The loser when it no longer depends on how the game is played, otherwise None.
+
+    With nothing reachable the player to move loses. With a single reachable cell whoever takes it
+    leaves the next player stuck; that is the case when the only target has no empty neighbour, so
+    one step of the flood decides it.
+    """
+    targets = state.head_targets | state.tail_targets
+    if not targets:
+        return state.current_player
+    if targets & (targets - 1) or dilate(targets, state.width, state.height) & state.empty != targets:
+        return None
+    return (state.current_player + 1) % state.players
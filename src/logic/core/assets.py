@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+import pygame
+
+STAIN_COUNT = 15
+
+
+@lru_cache(maxsize=None)
+def stain_image(index: int) -> pygame.Surface:
+    return pygame.image.load(f"assets/stains/s{index}.png").convert_alpha()
+
+
+# keyed by radius, which changes with every zoom step
+@lru_cache(maxsize=1024)
+def scaled_stain_image(index: int, node_radius: float) -> pygame.Surface:
+    return pygame.transform.scale_by(stain_image(index), node_radius / 100)
@@ -1,26 +1,22 @@
-from dataclasses import dataclass
-from itertools import cycle
 import math
 import random
 
 import pygame
 from src.const.colors import GameColors
-from src.logic.core.utils import Connectivity, NodeVisual, Point, flatten
-from src.logic.core.objects import Connection, Node
-
-
-@dataclass
-class PlayerVisual:
-    name: str
-    connection_color: tuple
-    turn: bool = False
-    lost: bool = False
-
-    def __repr__(self) -> str:
-        return f"{self.name}"
+from src.logic.core.analysis import Reach, reach, regions
+from src.logic.core.layout import Layout
+from src.logic.core.utils import Connectivity, PlayerVisual, Point
+from src.logic.core.objects import Connection, Node, ms_to_next_pulse, pulse_at
+from src.logic.core.profiling import FrameProfiler
+from src.logic.core.record import GameRecord
+from src.logic.core.state import GameState, decode_move, encode_move, iter_bits
 
 
 class Board:
+    READABLE_INTERVAL = 60
+    DETAIL_MIN_INTERVAL = 12
+    # for seats a given state has beyond the visuals passed in (records allow up to 255 players)
+    EXTRA_COLORS = [GameColors.PURPLE, GameColors.AZURE, GameColors.PACIFIC_BLUE, GameColors.RED, GameColors.GREEN]
 
     def __init__(
         self,
@@ -30,127 +26,189 @@ class Board:
         start_anchor: Point = None,
         players: list[PlayerVisual] = None,
         wall_density: float = 0.05,
+        profiler: FrameProfiler = None,
+        state: GameState = None,
+        seed: int = None,
     ):
         self.height = height
         self.width = width
+        # one seed drives the game (anchor, walls, simulations) and, through a separate stream, the
+        # hand-drawn visuals, so redrawing never changes what the game does next
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.rng = random.Random(self.seed)
+        self.visual_rng = random.Random(f"{self.seed}:visual")
+        if state:
+            start_anchor = state.anchor
         self.start_anchor = (
             start_anchor
             if start_anchor
-            else Point(random.randint(0, self.width - 1), random.randint(0, self.height - 1))
+            else Point(self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1))
         )
 
         self.surface = surface
-        node_interval_x = self.surface.get_width() / self.width
-        node_interval_y = self.surface.get_height() / self.height + 100
-        node_radius = ((self.surface.get_width() + self.surface.get_height()) / 2) / ((self.width + self.height) * 2)
-        node_interval = min(node_interval_x, node_interval_y - 100)
-
-        self.node_style = NodeVisual(
-            COORD_MARGIN_X=node_interval_x,
-            COORD_MARGIN_Y=node_interval_y,
-            NODE_RADIUS=node_radius,
-            NODE_INTERVAL_X=node_interval - node_interval / max(self.width, self.height),
-            NODE_INTERVAL_Y=node_interval - node_interval / max(self.width, self.height),
-            HOVER_HIT_RADIUS=int(node_radius * 0.2),
-            SCALE_FACTOR=0,
+        self.profiler = profiler or FrameProfiler()
+        self.zoom = 1.0
+        self.pan = (0.0, 0.0)
+        self.layout = Layout.fit(self.width, self.height, self.surface.get_size(), self.zoom)
+        self.node_style = self.layout.node_style
+        self.player_visuals = players or [
+            PlayerVisual(name="Player 1", connection_color=GameColors.CYAN),
+            PlayerVisual(name="Player 2", connection_color=GameColors.YELLOW),
+        ]
+        if state and state.players > len(self.player_visuals):
+            self.player_visuals = self.player_visuals + [
+                PlayerVisual(
+                    name=f"Player {seat + 1}",
+                    connection_color=self.EXTRA_COLORS[seat % len(self.EXTRA_COLORS)],
+                )
+                for seat in range(len(self.player_visuals), state.players)
+            ]
+        self.state = state or GameState.random(
+            width=self.width,
+            height=self.height,
+            anchor=self.start_anchor,
+            wall_density=wall_density,
+            players=len(self.player_visuals),
+            rng=self.rng,
         )
+        walls = set(iter_bits(self.state.walls))
         self.nodes: list[Node] = [
             [
                 Node(
                     x=x,
                     y=y,
-                    anchor=self.start_anchor == Point(x, y),
+                    anchor=x == self.start_anchor.x and y == self.start_anchor.y,
                     surface=surface,
                     node_style=self.node_style,
-                    wall=random.choices([True, False], [wall_density, 1 - wall_density])[-1],
+                    v_coords=Point(self.layout.xs[x], self.layout.ys[y]),
+                    wall=y * self.width + x in walls,
+                    rng=self.visual_rng,
                 )
                 for x in range(self.width)
             ]
             for y in range(self.height)
         ]
+        self.layout_version = 0
+        # walls never move, so culling can look them up by row
+        self.wall_rows: list[list[int]] = [[] for _ in range(self.height)]
+        for cell in sorted(walls):
+            self.wall_rows[cell // self.width].append(cell % self.width)
         self.head: Node = self.nodes[self.start_anchor.y][self.start_anchor.x]
         self.tail: Node = self.nodes[self.start_anchor.y][self.start_anchor.x]
         self.connections: list[Connection] = []
-
-        self.players = cycle(
-            players
-            or [
-                PlayerVisual(name="Player 1", connection_color=GameColors.CYAN),
-                PlayerVisual(name="Player 2", connection_color=GameColors.YELLOW),
-            ]
-        )
-        self.current_player = next(self.players)
+        self.history: list[tuple] = []
+        self._moves: list[Connectivity] = []
+        self._moves_version = -1
+        self._reach: Reach = None
+        self._reach_version = -1
+        self.heatmap = False
+        self._heatmap: pygame.Surface = None
+        self._heatmap_key: tuple = None
+
+        self.paper_margins: tuple[list[int], ...] = ()
         self.paper = self.paper_bg()
+        self.base: pygame.Surface = None
+        self.layer: pygame.Surface = None
+        self._layer_stale = True
+        self._frame_key: tuple = None
+        self.drawn_version = -1  # state version shown by the last draw()
 
     def possible_connections(self, node: Node = None) -> list[Connectivity]:
         if not node:
             node = self.head
-        surrounding_nodes = [
-            node
-            for node in [
-                Point(node.x - 1, node.y - 1),
-                Point(node.x, node.y - 1),
-                Point(node.x + 1, node.y - 1),
-                Point(node.x - 1, node.y),
-                Point(node.x + 1, node.y),
-                Point(node.x - 1, node.y + 1),
-                Point(node.x, node.y + 1),
-                Point(node.x + 1, node.y + 1),
-            ]
-            if node.x < self.width and node.y < self.height
-        ]
-
-        def _crossing(p: Point) -> bool:
-            if abs(node.x - p.x) > 0 or abs(node.y - p.y) > 0:
-                return (self.nodes[p.y][node.x].connected and self.nodes[node.y][p.x].connected) and bool(
-                    len(
-                        [
-                            link
-                            for link in self.connections
-                            if (
-                                link.end.coords == self.nodes[p.y][node.x].coords
-                                and link.start.coords == self.nodes[node.y][p.x].coords
-                            )
-                            or (
-                                link.start.coords == self.nodes[p.y][node.x].coords
-                                and link.end.coords == self.nodes[node.y][p.x].coords
-                            )
-                        ]
-                    )
-                )
-            else:
-                return False
-
-        return [
-            connectivity
-            for connectivity in [node.can_connect(self.nodes[p.y][p.x]) for p in surrounding_nodes if not _crossing(p)]
-            if connectivity.possible
-        ]
+        return self.state.possible_connections(node.coords)
 
     def available_moves(self) -> list[Connectivity]:
-        available_moves = []
-        for move in self.possible_connections(self.head) + self.possible_connections(self.tail):
-            if move.possible and move not in available_moves:
-                available_moves.append(move)
-        return available_moves
-
-    def connect_head(self, connectivity: Connectivity) -> None:
-        connection = self.head.connect(self.nodes[connectivity.end.y][connectivity.end.x], self.current_player)
-        if connection:
-            self.connections.append(connection)
+        if self._moves_version != self.state.version:
+            self._moves = self.state.available_moves()
+            self._moves_version = self.state.version
+        return self._moves
+
+    def reach(self) -> Reach:
+        if self._reach_version != self.state.version:
+            self._reach = reach(self.state)
+            self._reach_version = self.state.version
+        return self._reach
+
+    @property
+    def current_player(self) -> PlayerVisual:
+        return self.player_visuals[self.state.current_player]
+
+    def _apply(self, from_head: bool, connectivity: Connectivity) -> bool:
+        start = self.head if from_head else self.tail
+        if not self.state.can_connect(start.coords, connectivity.end):
+            return False
+        end = self.placed(self.nodes[connectivity.end.y][connectivity.end.x])
+        self.placed(start)
+        connection = start.connect(end, self.current_player, ctype=connectivity.value)
+        connection.layout_version = self.layout_version
+        self.connections.append(connection)
+        self.bake(connection)
+        self.history.append(self.state.apply_move(encode_move(from_head, self.state.index(connectivity.end))))
+        if from_head:
             self.head.is_head = False
-            self.head = self.nodes[connectivity.end.y][connectivity.end.x]
+            self.head = end
             self.head.is_head = True
-            self.current_player = next(self.players)
+        else:
+            self.tail.is_tail = False
+            self.tail = end
+            self.tail.is_tail = True
+        return True
+
+    def apply_move(self, connectivity: Connectivity) -> bool:
+        return self._apply(connectivity.from_head, connectivity)
+
+    def connect_head(self, connectivity: Connectivity) -> None:
+        self._apply(True, connectivity)
 
     def connect_tail(self, connectivity: Connectivity) -> None:
-        connection = self.tail.connect(self.nodes[connectivity.end.y][connectivity.end.x], self.current_player)
-        if connection:
-            self.connections.append(connection)
+        self._apply(False, connectivity)
+
+    def undo_move(self) -> bool:
+        if not self.history:
+            return False
+        record = self.history.pop()
+        self.state.undo_move(record)
+        connection = self.connections.pop()
+        connection.start.disconnect(connection.end)
+        self._layer_stale = True
+        if record[0]:
+            self.head.is_head = False
+            self.head = connection.start
+            self.head.is_head = True
+        else:
             self.tail.is_tail = False
-            self.tail = self.nodes[connectivity.end.y][connectivity.end.x]
+            self.tail = connection.start
             self.tail.is_tail = True
-            self.current_player = next(self.players)
+        return True
+
+    @classmethod
+    def from_record(cls, record: GameRecord, surface: pygame.Surface, players: list[PlayerVisual] = None) -> "Board":
+        board = cls(
+            height=record.height,
+            width=record.width,
+            surface=surface,
+            players=players,
+            state=record.initial_state(),
+            seed=record.seed,
+        )
+        # the end comes from the move itself: while head and tail share a cell a Connectivity is flagged as both
+        for move in record.moves(record.initial_state()):
+            board._apply(decode_move(move)[0], board.state.connectivity(move))
+        return board
+
+    def record(self) -> GameRecord:
+        moves = [encode_move(entry[0], entry[2]) for entry in self.history]
+        return GameRecord.from_moves(self.state, moves, seed=self.seed)
+
+    def reset(self) -> None:
+        while self.undo_move():
+            pass
+
+    def play_ai_turn(self) -> bool:
+        if not self.current_player.ai or not self.available_moves():
+            return False
+        return self.apply_move(self.current_player.ai.choose(self.state))
 
     def display_as_text(self):
         print("  ", end="")
@@ -168,107 +226,286 @@ class Board:
         MIN_PAPER_MARGIN = 25
         MAX_PAPER_MARGIN = 55
 
-        def _get_margin() -> int:
-            return random.randint(MIN_PAPER_MARGIN, MAX_PAPER_MARGIN)
+        def _get_margins(count: int) -> list[int]:
+            return [self.visual_rng.randint(MIN_PAPER_MARGIN, MAX_PAPER_MARGIN) for _ in range(count)]
 
-        horizontal_top_points = [
-            (point.x, point.y - _get_margin()) for point in [self.nodes[0][col].v_coords for col in range(self.width)]
-        ][::-1]
-        horizontal_bottom_points = [
-            (point.x, point.y + _get_margin()) for point in [self.nodes[-1][col].v_coords for col in range(self.width)]
-        ]
-        vertical_left_points = [
-            (point.x - _get_margin(), point.y) for point in [self.nodes[row][0].v_coords for row in range(self.height)]
-        ]
-        vertical_right_points = [
-            (point.x + _get_margin(), point.y) for point in [self.nodes[row][-1].v_coords for row in range(self.height)]
-        ][::-1]
+        # the ragged edge is drawn once per board so it stays put while panning and zooming
+        if not self.paper_margins:
+            self.paper_margins = (
+                _get_margins(self.width),
+                _get_margins(self.width),
+                _get_margins(self.height),
+                _get_margins(self.height),
+            )
+        top, bottom, left, right = self.paper_margins
+        xs, ys = self.layout.xs, self.layout.ys
+        horizontal_top_points = [(x, ys[0] - margin) for x, margin in zip(xs, top)][::-1]
+        horizontal_bottom_points = [(x, ys[-1] + margin) for x, margin in zip(xs, bottom)]
+        vertical_left_points = [(xs[0] - margin, y) for y, margin in zip(ys, left)]
+        vertical_right_points = [(xs[-1] + margin, y) for y, margin in zip(ys, right)][::-1]
         return (
             vertical_left_points + horizontal_bottom_points + vertical_right_points + horizontal_top_points,
             list(zip(horizontal_top_points[::-1], horizontal_bottom_points)),
             list(zip(vertical_left_points, vertical_right_points[::-1])),
         )
 
-    def draw_paper_bg(self) -> None:
+    def draw_paper_bg(self, surface: pygame.Surface = None, columns: range = None, rows: range = None) -> None:
+        surface = surface or self.surface
         paper, vertical, horizontal = self.paper
         line_color = GameColors.PACIFIC_BLUE
+        columns = range(self.width) if columns is None else columns
+        rows = range(self.height) if rows is None else rows
 
         # pygame.draw.polygon(surface=self.surface, color=GameColors.CHALK_WHITE, width=0, points=paper)
-        pygame.draw.aalines(self.surface, color=line_color, closed=True, points=paper)
+        pygame.draw.aalines(surface, color=line_color, closed=True, points=paper)
 
-        for hline in horizontal:
-            pygame.draw.line(self.surface, color=line_color, start_pos=hline[0], end_pos=hline[1])
+        for hline in horizontal[rows.start : rows.stop]:
+            pygame.draw.line(surface, color=line_color, start_pos=hline[0], end_pos=hline[1])
 
-        for vline in vertical:
-            pygame.draw.aaline(self.surface, color=line_color, start_pos=vline[0], end_pos=vline[1])
+        for vline in vertical[columns.start : columns.stop]:
+            pygame.draw.aaline(surface, color=line_color, start_pos=vline[0], end_pos=vline[1])
 
     def draw_game_bounds(self) -> None:
-        points = [
-            Point(
-                self.nodes[0][0].v_coords.x - self.node_style.NODE_INTERVAL_X - 4,
-                self.nodes[0][0].v_coords.y - self.node_style.NODE_INTERVAL_Y,
-            ).tuple,
-            Point(
-                self.nodes[0][self.width - 1].v_coords.x + self.node_style.NODE_INTERVAL_X - 4,
-                self.nodes[0][self.width - 1].v_coords.y - self.node_style.NODE_INTERVAL_Y,
-            ).tuple,
-            Point(
-                self.nodes[self.height - 1][self.width - 1].v_coords.x + self.node_style.NODE_INTERVAL_X - 4,
-                self.nodes[self.height - 1][self.width - 1].v_coords.y + self.node_style.NODE_INTERVAL_Y,
-            ).tuple,
-            Point(
-                self.nodes[self.height - 1][0].v_coords.x - self.node_style.NODE_INTERVAL_X - 4,
-                self.nodes[self.height - 1][0].v_coords.y + self.node_style.NODE_INTERVAL_Y,
-            ).tuple,
-        ]
+        left = self.layout.xs[0] - self.node_style.NODE_INTERVAL_X - 4
+        right = self.layout.xs[-1] + self.node_style.NODE_INTERVAL_X - 4
+        top = self.layout.ys[0] - self.node_style.NODE_INTERVAL_Y
+        bottom = self.layout.ys[-1] + self.node_style.NODE_INTERVAL_Y
+        points = [(left, top), (right, top), (right, bottom), (left, bottom)]
         pygame.draw.polygon(self.surface, color=GameColors.RED, points=points, width=4)
 
-    def draw(self) -> None:
-        self.draw_paper_bg()
+    # Nodes and connections are only moved to a new layout when they are next drawn, so zooming and panning
+    # cost the same on a 500x500 board as on a 4x4 one.
+    def relayout(self, zoom: float = None, pan: tuple[float, float] = None) -> None:
+        self.zoom = zoom if zoom else self.zoom
+        self.pan = pan if pan else self.pan
+        self.layout = Layout.fit(self.width, self.height, self.surface.get_size(), self.zoom, self.pan)
+        self.node_style = self.layout.node_style
+        self.layout_version += 1
+        self.paper = self.paper_bg()
+        self.base = None
+        self._layer_stale = True
+
+    def zoom_at(self, pos: tuple, zoom: float) -> None:
+        # keep the board point under `pos` where it is
+        style = self.node_style
+        grid_x = (pos[0] - style.COORD_MARGIN_X) / style.NODE_INTERVAL_X
+        grid_y = (pos[1] - style.COORD_MARGIN_Y) / style.NODE_INTERVAL_Y
+        self.relayout(zoom=zoom)
+        style = self.node_style
+        self.pan_by(
+            (
+                pos[0] - style.COORD_MARGIN_X - grid_x * style.NODE_INTERVAL_X,
+                pos[1] - style.COORD_MARGIN_Y - grid_y * style.NODE_INTERVAL_Y,
+            )
+        )
+
+    def pan_by(self, delta: tuple) -> None:
+        self.relayout(pan=(self.pan[0] + delta[0], self.pan[1] + delta[1]))
+
+    @property
+    def max_zoom(self) -> float:
+        # enough to bring any board up to readable cells
+        return max(4.0, self.READABLE_INTERVAL * self.zoom / self.node_style.NODE_INTERVAL_X)
+
+    @property
+    def detailed(self) -> bool:
+        return self.node_style.NODE_INTERVAL_X >= self.DETAIL_MIN_INTERVAL
+
+    def visible_cells(self) -> tuple[range, range]:
+        # inverse of the layout tables, one cell of margin for strokes and stains that reach over
+        style = self.node_style
+        surface_width, surface_height = self.surface.get_size()
+        step_x = style.SCALE_FACTOR + style.NODE_INTERVAL_X
+        step_y = style.SCALE_FACTOR + style.NODE_INTERVAL_Y
+        return (
+            range(
+                max(0, math.floor(-style.COORD_MARGIN_X / step_x) - 1),
+                min(self.width, math.ceil((surface_width - style.COORD_MARGIN_X) / step_x) + 2),
+            ),
+            range(
+                max(0, math.floor(-style.COORD_MARGIN_Y / step_y) - 1),
+                min(self.height, math.ceil((surface_height - style.COORD_MARGIN_Y) / step_y) + 2),
+            ),
+        )
+
+    def placed(self, node: Node) -> Node:
+        if node.layout_version != self.layout_version:
+            node.place(self.node_style, Point(self.layout.xs[node.x], self.layout.ys[node.y]))
+            node.layout_version = self.layout_version
+        return node
+
+    def draw_connection(self, connection: Connection, surface: pygame.Surface) -> pygame.Rect:
+        if connection.layout_version != self.layout_version:
+            connection.strokes = None
+            connection.layout_version = self.layout_version
+        return connection.draw(surface, detailed=self.detailed)
+
+    # Paper and walls only change on relayout and are kept on their own base, so rebuilding the layer after an
+    # undo costs one copy plus the visible connections.
+    def build_base(self) -> None:
+        self.base = pygame.Surface(self.surface.get_size(), 0, self.surface)
+        self.base.fill(GameColors.WHITE)
+        xs, ys = self.visible_cells()
+        with self.profiler.phase("draw.paper"):
+            self.draw_paper_bg(self.base, xs, ys)
+        detailed = self.detailed
+        size = max(1, round(self.node_style.NODE_RADIUS))
+        with self.profiler.phase("draw.nodes"):
+            for y in ys:
+                for x in self.wall_rows[y]:
+                    if x not in xs:
+                        continue
+                    if detailed:
+                        self.placed(self.nodes[y][x]).draw_static(self.base)
+                    else:
+                        # too small for the stain to be visible
+                        left, top = self.layout.xs[x] - size / 2, self.layout.ys[y] - size / 2
+                        self.base.fill(GameColors.GREY, (left, top, size, size))
+
+    def build_layer(self) -> None:
+        if self.base is None or self.base.get_size() != self.surface.get_size():
+            self.build_base()
+        self.layer = self.base.copy()
+        xs, ys = self.visible_cells()
+        visible = [
+            connection
+            for connection in self.connections
+            if (connection.start.x in xs and connection.start.y in ys)
+            or (connection.end.x in xs and connection.end.y in ys)
+        ]
+        with self.profiler.phase("draw.connections"):
+            for connection in visible:
+                self.placed(connection.start)
+                self.placed(connection.end)
+                self.draw_connection(connection, self.layer)
+            for connection in visible:
+                connection.start.draw_static(self.layer)
+                connection.end.draw_static(self.layer)
+        self._layer_stale = False
+        self._baked: list[pygame.Rect] = []
+        self._markers: list[pygame.Rect] = []
+
+    def bake(self, connection: Connection) -> None:
+        if self._layer_stale:
+            return
+        self._baked.append(self.draw_connection(connection, self.layer))
+        for node in (connection.start, connection.end):
+            self._baked.append(node.draw_static(self.layer))
+
+    # empty cells tinted by the size of their region; regions neither end can reach any more are grey
+    def build_heatmap(self) -> pygame.Surface:
+        heatmap = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+        reachable = self.reach().cells
+        found = regions(self.state.empty, self.width, self.height)
+        largest = max((region.bit_count() for region in found), default=1)
+        xs, ys = self.visible_cells()
+        size = self.node_style.NODE_INTERVAL_X * 0.8
+        for region in found:
+            if region & reachable:
+                color = (*GameColors.RED, 30 + 90 * region.bit_count() // largest)
+            else:
+                color = (*GameColors.GREY, 60)
+            for cell in iter_bits(region):
+                y, x = divmod(cell, self.width)
+                if x in xs and y in ys:
+                    heatmap.fill(color, (self.layout.xs[x] - size / 2, self.layout.ys[y] - size / 2, size, size))
+        return heatmap
+
+    def draw_heatmap(self) -> pygame.Rect:
+        key = (self.state.version, self.layout_version, self.surface.get_size())
+        if self._heatmap_key != key:
+            self._heatmap = self.build_heatmap()
+            self._heatmap_key = key
+        rect = self._heatmap.get_bounding_rect()
+        return self.surface.blit(self._heatmap, rect, rect)
+
+    def restore(self, rect: pygame.Rect) -> None:
+        self.surface.blit(self.layer, rect, rect)
+
+    # everything drawn on top of the layer depends only on this key, so an unchanged key means an unchanged frame
+    def frame_key(self, hovered: Node | None, now: int) -> tuple:
+        pulse = pulse_at(now) if self.available_moves() else 0
+        return (self.state.version, self.heatmap, hovered.coords if hovered else None, pulse)
+
+    def needs_redraw(self, mouse_pos: tuple, now: int) -> bool:
+        return self._layer_stale or self._frame_key != self.frame_key(self.node_at(mouse_pos), now)
+
+    def ms_to_next_frame(self, now: int) -> int | None:
+        return ms_to_next_pulse(now) if self.available_moves() else None
+
+    def draw(self, mouse_pos: tuple = None, now: int = None) -> list[pygame.Rect]:
+        now = pygame.time.get_ticks() if now is None else now
+        hovered = self.node_at(mouse_pos if mouse_pos else pygame.mouse.get_pos())
+        self._frame_key = self.frame_key(hovered, now)
+        pulse = self._frame_key[-1]
+        if self._layer_stale:
+            self.build_layer()
+            self.surface.blit(self.layer, (0, 0))
+            dirty = [self.surface.get_rect()]
+        else:
+            dirty = self._markers + self._baked
+            with self.profiler.phase("draw.restore"):
+                for rect in dirty:
+                    self.restore(rect)
         # self.draw_game_bounds()
 
-        for connection in self.connections:
-            connection.draw()
-        for node in flatten(self.nodes):
-            node.draw(self.current_player)
-        for possible in self.available_moves():
-            self.nodes[possible.end.y][possible.end.x].draw(self.current_player, as_future_target=True)
+        with self.profiler.phase("available_moves"):
+            moves = self.available_moves()
+        markers = []
+        if self.heatmap:
+            with self.profiler.phase("draw.heatmap"):
+                markers.append(self.draw_heatmap())
+        with self.profiler.phase("draw.targets"):
+            player = self.current_player
+            markers += self.placed(self.head).draw(player) + self.placed(self.tail).draw(player)
+            for possible in moves:
+                node = self.placed(self.nodes[possible.end.y][possible.end.x])
+                markers += node.draw(self.current_player, as_future_target=True, hovered=node is hovered, pulse=pulse)
+
+        self._baked = []
+        self._markers = markers
+        self.drawn_version = self.state.version
+        return dirty + markers
 
     def random_simulation(self) -> None:
-        while self.available_moves():
-            (
-                self.connect_head(random.choice(self.possible_connections(self.head)))
-                if self.possible_connections(self.head)
-                else self.connect_tail(random.choice(self.possible_connections(self.tail)))
-            )
+        while moves := self.available_moves():
+            head_moves = [move for move in moves if move.from_head]
+            if head_moves:
+                self.connect_head(self.rng.choice(head_moves))
+            else:
+                self.connect_tail(self.rng.choice(moves))
+
+    # v_coords is linear in the grid position, so a screen position maps back to a single candidate cell.
+    def node_at(self, mouse_pos: tuple) -> Node | None:
+        style = self.node_style
+        x = round((mouse_pos[0] - style.COORD_MARGIN_X) / (style.SCALE_FACTOR + style.NODE_INTERVAL_X))
+        y = round((mouse_pos[1] - style.COORD_MARGIN_Y) / (style.SCALE_FACTOR + style.NODE_INTERVAL_Y))
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        hit_radius = style.NODE_RADIUS + style.HOVER_HIT_RADIUS
+        if (self.layout.xs[x] - mouse_pos[0]) ** 2 + (self.layout.ys[y] - mouse_pos[1]) ** 2 < hit_radius**2:
+            return self.nodes[y][x]
+        return None
 
     def pick_next_by_mouse(self, mouse_pos: tuple) -> Connectivity | None:
-
-        def _mouse_over_node(node: Node) -> bool:
-            return (
-                math.sqrt((node.v_coords.x - mouse_pos[0]) ** 2 + (node.v_coords.y - mouse_pos[1]) ** 2)
-                < self.node_style.NODE_RADIUS + self.node_style.HOVER_HIT_RADIUS
-            )
-
+        node = self.node_at(mouse_pos)
+        if not node:
+            return None
         for connectivity in self.available_moves():
-            node = self.nodes[connectivity.end.y][connectivity.end.x]
-
-            if _mouse_over_node(node):
+            if connectivity.end == node.coords:
                 return connectivity
-
         return None
 
     def get_hovered_node(self, mouse_pos: tuple) -> Node | None:
-        for node in flatten(self.nodes):
-            if node.hovered(mouse_pos):
-                return node
+        return self.node_at(mouse_pos)
 
     def flush(self) -> "Board":
         self = self.__class__(
             height=self.height,
             width=self.width,
-            start_anchor=Point(random.randint(0, self.width - 1), random.randint(0, self.height - 1)),
             surface=self.surface,
-            players=self.players,
+            seed=self.rng.getrandbits(63),
+            players=self.player_visuals,
+            profiler=self.profiler,
         )
         return self
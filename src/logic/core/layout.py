@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+
+from src.logic.core.utils import NodeVisual
+
+
+@dataclass
+class Layout:
+    node_style: NodeVisual
+    xs: list[float]
+    ys: list[float]
+
+    # Screen x only depends on the column and y only on the row, so the whole grid is described
+    # by one table per axis.
+    @classmethod
+    def fit(
+        cls,
+        width: int,
+        height: int,
+        surface_size: tuple[int, int],
+        zoom: float = 1.0,
+        pan: tuple[float, float] = (0.0, 0.0),
+    ) -> "Layout":
+        surface_width, surface_height = surface_size
+        node_interval_x = surface_width / width
+        node_interval_y = surface_height / height + 100
+        node_radius = ((surface_width + surface_height) / 2) / ((width + height) * 2)
+        node_interval = min(node_interval_x, node_interval_y - 100)
+        node_interval -= node_interval / max(width, height)
+
+        # zoom around the centre of the board, then pan by a screen offset
+        center_x = node_interval_x + (width - 1) * node_interval / 2 + pan[0]
+        center_y = node_interval_y + (height - 1) * node_interval / 2 + pan[1]
+        node_interval *= zoom
+        node_radius *= zoom
+
+        node_style = NodeVisual(
+            COORD_MARGIN_X=center_x - (width - 1) * node_interval / 2,
+            COORD_MARGIN_Y=center_y - (height - 1) * node_interval / 2,
+            NODE_RADIUS=node_radius,
+            NODE_INTERVAL_X=node_interval,
+            NODE_INTERVAL_Y=node_interval,
+            HOVER_HIT_RADIUS=int(node_radius * 0.2),
+            SCALE_FACTOR=0,
+        )
+        return cls(
+            node_style=node_style,
+            xs=[node_style.COORD_MARGIN_X + x * node_interval for x in range(width)],
+            ys=[node_style.COORD_MARGIN_Y + y * node_interval for y in range(height)],
+        )
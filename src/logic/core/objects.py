@@ -1,11 +1,14 @@
-import math
-import random
+import bisect
+import functools
 import itertools
+import random
+from array import array
 
 import pygame
 from src.const.colors import GameColors
 from src.const.symbols import BoardSymbol
-from src.logic.core.utils import Connectivity, NodeVisual, PlayerVisual, Point
+from src.logic.core.assets import STAIN_COUNT, scaled_stain_image
+from src.logic.core.utils import NodeVisual, PlayerVisual, Point
 
 
 class Connection(pygame.sprite.Sprite):
@@ -17,6 +20,7 @@ class Connection(pygame.sprite.Sprite):
         player: PlayerVisual,
         surface: pygame.Surface,
         ctype: str = BoardSymbol.Connection.IMPOSSIBLE,
+        rng: random.Random = None,
     ):
         super().__init__()
         self.start = start
@@ -24,33 +28,47 @@ class Connection(pygame.sprite.Sprite):
         self.ctype = ctype
         self.player = player
         self.surface = surface
-        self.hand_drawn_line = []
+        self.rng = rng or start.rng
+        self.layout_version = 0
+        self.strokes: array = None
 
     def __repr__(self) -> str:
         return f"{self.ctype}"
 
-    def hand_drawn_lines_points(self, segments: int = 10, jitter: int = 5) -> list[Point]:
-        points = []
-        for i in range(segments + 1):
-            t = i / segments
-            x = self.start.v_coords.x + (self.end.v_coords.x - self.start.v_coords.x) * t
-            y = self.start.v_coords.y + (self.end.v_coords.y - self.start.v_coords.y) * t
-            x += random.uniform(-jitter, jitter)
-            y += random.uniform(-jitter, jitter)
-            points.append((x, y))
-
-        return points
-
-    def get_hand_drawn_line(self) -> list[Point]:
-        points = []
-        for _ in range(5):
-            points.append(self.hand_drawn_lines_points())
-        self.hand_drawn_line = points if not self.hand_drawn_line else self.hand_drawn_line
-        return self.hand_drawn_line
-
-    def draw(self) -> None:
-        for points in self.get_hand_drawn_line():
-            pygame.draw.lines(self.surface, self.player.connection_color, False, points, 2)
+    # jittered strokes are generated on first draw for a layout and kept as a flat x, y float array
+    def tessellate(self, strokes: int = 5, segments: int = 10, jitter: int = 5) -> None:
+        start, end = self.start.v_coords, self.end.v_coords
+        dx, dy = (end.x - start.x) / segments, (end.y - start.y) / segments
+        noise = self.rng.random
+        self.segments = segments
+        self.strokes = array(
+            "f",
+            [
+                coord
+                for _ in range(strokes)
+                for i in range(segments + 1)
+                for coord in (
+                    start.x + dx * i + jitter * (2 * noise() - 1),
+                    start.y + dy * i + jitter * (2 * noise() - 1),
+                )
+            ],
+        )
+
+    def get_hand_drawn_line(self) -> list[list[tuple[float, float]]]:
+        if self.strokes is None:
+            self.tessellate()
+        coords = iter(self.strokes)
+        points = list(zip(coords, coords))
+        step = self.segments + 1
+        return [points[i : i + step] for i in range(0, len(points), step)]
+
+    def draw(self, surface: pygame.Surface = None, detailed: bool = True) -> pygame.Rect:
+        surface = surface or self.surface
+        color = self.player.connection_color
+        if not detailed:
+            return pygame.draw.line(surface, color, self.start.v_coords.tuple, self.end.v_coords.tuple, 1)
+        rects = [pygame.draw.lines(surface, color, False, points, 2) for points in self.get_hand_drawn_line()]
+        return rects[0].unionall(rects[1:])
 
     def __eq__(self, other: "Connection") -> bool:
         return (self.start == other.start and self.end == other.end) or (
@@ -58,14 +76,25 @@ class Connection(pygame.sprite.Sprite):
         )
 
 
+# target marker pulse: (radius offset, share of the period)
+PULSE_STEPS = [(1, 15), (2, 25), (3, 40), (2, 25), (1, 15)]
+PULSE_PERIOD_MS = 1000
+_PULSE_ENDS = [
+    PULSE_PERIOD_MS * end // sum(share for _, share in PULSE_STEPS)
+    for end in itertools.accumulate(share for _, share in PULSE_STEPS)
+]
+
+
+def pulse_at(ms: int) -> int:
+    return PULSE_STEPS[bisect.bisect_right(_PULSE_ENDS, ms % PULSE_PERIOD_MS)][0]
+
+
+def ms_to_next_pulse(ms: int) -> int:
+    phase = ms % PULSE_PERIOD_MS
+    return _PULSE_ENDS[bisect.bisect_right(_PULSE_ENDS, phase)] - phase
+
+
 class Node(pygame.sprite.Sprite):
-    node_animation_frame = itertools.cycle(
-        [1 for _ in range(15)]
-        + [2 for _ in range(25)]
-        + [3 for _ in range(40)]
-        + [2 for _ in range(25)]
-        + [1 for _ in range(15)]
-    )
 
     def __init__(
         self,
@@ -76,6 +105,8 @@ class Node(pygame.sprite.Sprite):
         wall: bool = False,
         connections: list[Connection] = None,
         node_style: NodeVisual = None,
+        v_coords: Point = None,
+        rng: random.Random = None,
     ):
         super().__init__()
         self.x = x
@@ -87,13 +118,19 @@ class Node(pygame.sprite.Sprite):
         self.is_wall = wall if not self.anchor else False
         self.connections = connections or []
         self.surface = surface
-        self.node_style = node_style if node_style else NodeVisual()
-        self.wall_image = pygame.transform.scale_by(
-            pygame.image.load(f"assets/stains/s{random.randint(1,15)}.png").convert_alpha(),
-            self.node_style.NODE_RADIUS / 100,
+        self.rng = rng or random
+        self.stain = self.rng.randint(1, STAIN_COUNT) if self.is_wall else None
+        self.layout_version = 0
+        self.place(node_style if node_style else NodeVisual(), v_coords)
+
+    def place(self, node_style: NodeVisual, v_coords: Point = None) -> None:
+        self.node_style = node_style
+        self.v_coords = v_coords or Point(
+            self.x * (node_style.SCALE_FACTOR + node_style.NODE_INTERVAL_X) + node_style.COORD_MARGIN_X,
+            self.y * (node_style.SCALE_FACTOR + node_style.NODE_INTERVAL_Y) + node_style.COORD_MARGIN_Y,
         )
-
-        self.wall_cutout = self.get_wall_cutout_points()
+        self.wall_image = scaled_stain_image(self.stain, node_style.NODE_RADIUS) if self.is_wall else None
+        self.__dict__.pop("wall_cutout", None)
 
     def __repr__(self) -> str:
         if self.is_head:
@@ -113,89 +150,28 @@ class Node(pygame.sprite.Sprite):
     def coords(self) -> Point:
         return Point(self.x, self.y)
 
-    def can_connect(self, other: "Node" = None) -> Connectivity:
-        connectivity = Connectivity(
-            value=BoardSymbol.Connection.IMPOSSIBLE,
-            possible=False,
-            start=self.coords,
-            end=other.coords if other else Point(-1, -1),
-            from_head=self.is_head,
-            from_tail=self.is_tail,
-        )
-        if not other:
-            return connectivity
-        if other.is_wall:
-            return connectivity
-        if any([self.x < 0, self.y < 0, other.x < 0, other.y < 0]):
-            return connectivity
-        if not self.connected or other.connected:
-            return connectivity
-        elif abs(self.x - other.x) > 1 or abs(self.y - other.y) > 1:
-            return connectivity
-        else:
-            if self.x == other.x and self.y == other.y:
-                return connectivity
-            elif self.x == other.x and self.y > other.y:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.TOP
-            elif self.x == other.x and self.y < other.y:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.BOTTOM
-            elif self.y == other.y and self.x > other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.LEFT
-            elif self.y == other.y and self.x < other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.RIGHT
-            elif self.y > other.y and self.x > other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.TOP_LEFT
-            elif self.y > other.y and self.x < other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.TOP_RIGHT
-            elif self.y < other.y and self.x > other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.BOTTOM_LEFT
-            elif self.y < other.y and self.x < other.x:
-                connectivity.possible = True
-                connectivity.value = BoardSymbol.Connection.BOTTOM_RIGHT
-            else:
-                return connectivity
-        return connectivity
-
-    def connect(self, other: "Node", player: PlayerVisual) -> Connection | None:
-        connectivity = self.can_connect(other)
-        if connectivity.possible:
-            self.connected, other.connected = True, True
-            connection = Connection(
-                ctype=connectivity.value, start=self, end=other, surface=self.surface, player=player
-            )
-            self.connections.append(connection)
-            other.connections.append(connection)
-            return connection
-        else:
-            print(f"Can't connect {self} {self.coords} to {other} {other.coords} by {player.name}")
+    def connect(self, other: "Node", player: PlayerVisual, ctype: str) -> Connection:
+        self.connected, other.connected = True, True
+        connection = Connection(ctype=ctype, start=self, end=other, surface=self.surface, player=player, rng=self.rng)
+        self.connections.append(connection)
+        other.connections.append(connection)
+        return connection
 
-    @property
-    def v_coords(self) -> Point:
-        x = self.x * (self.node_style.SCALE_FACTOR + self.node_style.NODE_INTERVAL_X) + self.node_style.COORD_MARGIN_X
-        y = self.y * (self.node_style.SCALE_FACTOR + self.node_style.NODE_INTERVAL_Y) + self.node_style.COORD_MARGIN_Y
-        return Point(x, y)
+    def disconnect(self, other: "Node") -> None:
+        self.connections.pop()
+        other.connections.pop()
+        other.connected = bool(other.connections)
 
-    @property
-    def hovered(self) -> bool:
-        mouse_pos = Point.from_tuple(pygame.mouse.get_pos())
-        return (
-            math.sqrt((self.v_coords.x - mouse_pos.x) ** 2 + (self.v_coords.y - mouse_pos.y) ** 2)
-            < self.node_style.NODE_RADIUS + self.node_style.HOVER_HIT_RADIUS
-        )
+    @functools.cached_property
+    def wall_cutout(self) -> list[Point]:
+        return self.get_wall_cutout_points() if self.is_wall else []
 
     def get_wall_cutout_points(self) -> list[Point]:
         MIN_PAPER_MARGIN = int(self.node_style.NODE_RADIUS) - 5
         MAX_PAPER_MARGIN = int(self.node_style.NODE_RADIUS) + 10
 
         def _get_margin() -> int:
-            return random.randint(MIN_PAPER_MARGIN, MAX_PAPER_MARGIN)
+            return self.rng.randint(MIN_PAPER_MARGIN, MAX_PAPER_MARGIN)
 
         return [
             Point(self.v_coords.x - _get_margin(), self.v_coords.y - _get_margin()).tuple,
@@ -208,10 +184,11 @@ class Node(pygame.sprite.Sprite):
             Point(self.v_coords.x, self.v_coords.y - _get_margin()).tuple,
         ]
 
-    def draw(self, player: PlayerVisual = None, as_future_target: bool = False) -> None:
+    def draw_static(self, surface: pygame.Surface = None) -> pygame.Rect | None:
+        surface = surface or self.surface
 
         if self.is_wall:
-            self.surface.blit(
+            rect = surface.blit(
                 self.wall_image,
                 (self.v_coords.x - self.wall_image.get_width() / 2, self.v_coords.y - self.wall_image.get_height() / 2),
             )
@@ -220,38 +197,52 @@ class Node(pygame.sprite.Sprite):
             #     surface=self.surface, color=GameColors.PACIFIC_BLUE, closed=True, points=self.wall_cutout
             # )
 
-            return
+            return rect
 
         if self.connected and self.connections:
-            pygame.draw.circle(
-                surface=self.surface,
+            return pygame.draw.circle(
+                surface=surface,
                 color=self.connections[-1].player.connection_color,
                 center=self.v_coords.tuple,
                 radius=self.node_style.NODE_RADIUS / 2,
                 width=0,
             )
-        elif as_future_target:
-            pygame.draw.circle(
-                surface=self.surface,
-                color=GameColors.RED if not self.hovered else player.connection_color,
-                center=self.v_coords.tuple,
-                radius=self.node_style.NODE_RADIUS / 2 + next(self.node_animation_frame),
-                width=2 if not self.hovered else 0,
+        return None
+
+    def draw(
+        self, player: PlayerVisual = None, as_future_target: bool = False, hovered: bool = False, pulse: int = 1
+    ) -> list[pygame.Rect]:
+        rects = []
+
+        if as_future_target and not self.connected:
+            rects.append(
+                pygame.draw.circle(
+                    surface=self.surface,
+                    color=GameColors.RED if not hovered else player.connection_color,
+                    center=self.v_coords.tuple,
+                    radius=self.node_style.NODE_RADIUS / 2 + pulse,
+                    width=2 if not hovered else 0,
+                )
             )
 
         if self.is_head:
-            pygame.draw.circle(
-                surface=self.surface,
-                color=GameColors.WHITE_SMOKE if self.connections else GameColors.BLACK,
-                center=self.v_coords.tuple,
-                radius=self.node_style.NODE_RADIUS / 2 - 2,
-                width=2,
+            rects.append(
+                pygame.draw.circle(
+                    surface=self.surface,
+                    color=GameColors.WHITE_SMOKE if self.connections else GameColors.BLACK,
+                    center=self.v_coords.tuple,
+                    radius=self.node_style.NODE_RADIUS / 2 - 2,
+                    width=2,
+                )
             )
         elif self.is_tail:
-            pygame.draw.circle(
-                surface=self.surface,
-                color=GameColors.WHITE_SMOKE,
-                center=self.v_coords.tuple,
-                radius=self.node_style.NODE_RADIUS / 2 - 2,
-                width=2,
+            rects.append(
+                pygame.draw.circle(
+                    surface=self.surface,
+                    color=GameColors.WHITE_SMOKE,
+                    center=self.v_coords.tuple,
+                    radius=self.node_style.NODE_RADIUS / 2 - 2,
+                    width=2,
+                )
             )
+        return rects
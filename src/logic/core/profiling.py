@@ -0,0 +1,126 @@
+import cProfile
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+import pygame.freetype
+
+_NO_PHASE = nullcontext()
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler: "FrameProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.record(self.name, time.perf_counter() - self.started)
+
+
+class FrameProfiler:
+    """Rolling per-phase timings of the game loop, shown as an overlay while enabled.
+
+    ``LINES_PROFILE=1`` enables it at startup, ``LINES_PROFILE_DUMP=<path>`` also runs cProfile and
+    writes ``<path>.prof`` and a per-frame ``<path>.json`` trace on exit. Startup timings are printed to
+    stderr while enabled and kept in the trace.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 240, dump_path: str = None, refresh: int = 15):
+        self.enabled = enabled
+        self.window = window
+        self.refresh = refresh
+        self.frames = 0
+        self.overlay: pygame.Surface = None
+        self.dump_path = dump_path
+        self.samples: dict[str, deque[float]] = {}
+        self.frame: dict[str, float] = {}
+        self.trace: list[dict[str, float]] = []
+        self.startup_timings: dict[str, float] = {}
+        self.profile = cProfile.Profile() if dump_path else None
+        if self.profile and enabled:
+            self.profile.enable()
+
+    @classmethod
+    def from_env(cls) -> "FrameProfiler":
+        dump_path = os.environ.get("LINES_PROFILE_DUMP") or None
+        enabled = bool(dump_path) or os.environ.get("LINES_PROFILE", "0") not in ("", "0")
+        return cls(enabled=enabled, dump_path=dump_path)
+
+    def phase(self, name: str) -> Phase | nullcontext:
+        return Phase(self, name) if self.enabled else _NO_PHASE
+
+    def record(self, name: str, seconds: float) -> None:
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.window)
+        self.samples[name].append(seconds)
+        self.frame[name] = self.frame.get(name, 0.0) + seconds
+
+    def end_frame(self, frame_ms: int) -> None:
+        if not self.enabled:
+            return
+        self.record("frame", frame_ms / 1000)
+        self.frames += 1
+        if self.dump_path:
+            self.trace.append(self.frame)
+        self.frame = {}
+
+    def startup(self, timings: dict[str, float]) -> None:
+        self.startup_timings = dict(timings)
+        if self.enabled:
+            print("startup " + "  ".join(f"{name} {s * 1000:.1f} ms" for name, s in timings.items()), file=sys.stderr)
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        self.frame = {}
+        if self.profile:
+            self.profile.enable() if self.enabled else self.profile.disable()
+
+    def percentiles(self, name: str) -> tuple[float, float]:
+        ordered = sorted(self.samples[name])
+        return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)]
+
+    def lines(self) -> list[str]:
+        lines = []
+        for name in self.samples:
+            p50, p99 = self.percentiles(name)
+            lines.append(f"{name:<16} p50 {p50 * 1000:7.2f} ms  p99 {p99 * 1000:7.2f} ms")
+        return lines
+
+    # text rendering costs more than the phases being measured, so the overlay is redrawn every few frames
+    def draw(self, surface: pygame.Surface, font: pygame.freetype.Font, pos: tuple[int, int]) -> pygame.Rect:
+        if self.overlay is None or self.frames % self.refresh == 0:
+            lines = [font.render(line, bgcolor=(255, 255, 255))[0] for line in self.lines()]
+            line_height = font.get_sized_height() + 2
+            self.overlay = pygame.Surface(
+                (max((line.get_width() for line in lines), default=0), line_height * len(lines)), pygame.SRCALPHA
+            )
+            for i, line in enumerate(lines):
+                self.overlay.blit(line, (0, i * line_height))
+        return surface.blit(self.overlay, pos)
+
+    def dump(self) -> None:
+        if not self.dump_path:
+            return
+        if self.profile:
+            self.profile.disable()
+            self.profile.dump_stats(f"{self.dump_path}.prof")
+            if self.enabled:
+                self.profile.enable()
+        with open(f"{self.dump_path}.json", "w") as out:
+            json.dump(
+                {
+                    "phases": {name: dict(zip(("p50", "p99"), self.percentiles(name))) for name in self.samples},
+                    "startup": self.startup_timings,
+                    "frames": self.trace,
+                },
+                out,
+            )
@@ -0,0 +1,135 @@
+import struct
+from dataclasses import dataclass, replace
+from typing import BinaryIO, Iterator
+
+from src.logic.core.state import GameState, iter_bits
+from src.logic.core.utils import Point
+
+# A record is a fixed header, the wall bitboard, one byte per move (the 4-bit code from GameState.move_code)
+# and an END byte, so records can be appended to and read back from one stream without an index.
+MAGIC = b"LPG"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<3sBHHBIq")  # magic, version, width, height, players, anchor cell, seed (-1: unknown)
+END = 0xFF
+
+
+@dataclass(frozen=True, slots=True)
+class GameRecord:
+    width: int
+    height: int
+    players: int
+    anchor: Point
+    walls: int
+    codes: bytes
+    seed: int | None = None
+
+    @classmethod
+    def from_moves(cls, state: GameState, moves: list[int], seed: int = None) -> "GameRecord":
+        # only the board setup is taken from `state`, the moves are replayed from its initial position
+        record = cls.setup(state, seed)
+        replay = record.initial_state()
+        codes = bytearray()
+        for move in moves:
+            codes.append(replay.move_code(move))
+            replay.apply_move(move)
+        return replace(record, codes=bytes(codes))
+
+    @classmethod
+    def setup(cls, state: GameState, seed: int = None) -> "GameRecord":
+        return cls(state.width, state.height, state.players, state.anchor, state.walls, b"", seed)
+
+    def initial_state(self) -> GameState:
+        return GameState(
+            width=self.width,
+            height=self.height,
+            anchor=self.anchor,
+            walls=[Point(cell % self.width, cell // self.width) for cell in iter_bits(self.walls)],
+            players=self.players,
+        )
+
+    def moves(self, state: GameState = None) -> Iterator[int]:
+        """Replay the codes on ``state`` (a fresh initial state by default), yielding each move before applying it."""
+        state = state or self.initial_state()
+        for ply, code in enumerate(self.codes):
+            move = state.move_from_code(code)
+            if move is None or not state.is_legal(move):
+                raise ValueError(f"illegal move code {code:#x} at ply {ply}")
+            yield move
+            state.apply_move(move)
+
+    def final_state(self) -> GameState:
+        state = self.initial_state()
+        for _ in self.moves(state):
+            pass
+        return state
+
+    def to_bytes(self) -> bytes:
+        anchor = self.anchor.y * self.width + self.anchor.x
+        seed = -1 if self.seed is None else self.seed
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.width, self.height, self.players, anchor, seed)
+        walls = self.walls.to_bytes(wall_bytes(self.width, self.height), "little")
+        return header + walls + self.codes + bytes([END])
+
+
+def wall_bytes(width: int, height: int) -> int:
+    return (width * height + 7) // 8
+
+
+class RecordWriter:
+    """Appends records to a binary stream; a live game can be streamed with ``begin``/``add``/``end``."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.state: GameState = None
+
+    def write(self, record: GameRecord) -> None:
+        self.out.write(record.to_bytes())
+
+    def begin(self, state: GameState, seed: int = None) -> None:
+        record = GameRecord.setup(state, seed)
+        self.out.write(record.to_bytes()[:-1])
+        self.state = record.initial_state()
+
+    def add(self, move: int) -> None:
+        self.out.write(bytes([self.state.move_code(move)]))
+        self.state.apply_move(move)
+
+    def end(self) -> None:
+        self.out.write(bytes([END]))
+        self.state = None
+
+
+def parse_record(data: bytes, pos: int = 0) -> tuple[GameRecord, int] | None:
+    """Parse the record at ``pos`` and return it with the offset past its end, or None if ``data`` ends first."""
+    if len(data) - pos < HEADER.size:
+        return None
+    magic, version, width, height, players, anchor, seed = HEADER.unpack_from(data, pos)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"not a game record: {magic!r} version {version}")
+    codes_start = pos + HEADER.size + wall_bytes(width, height)
+    end = data.find(END, codes_start)
+    if end < 0:
+        return None
+    record = GameRecord(
+        width=width,
+        height=height,
+        players=players,
+        anchor=Point(anchor % width, anchor // width),
+        walls=int.from_bytes(data[pos + HEADER.size : codes_start], "little"),
+        codes=bytes(data[codes_start:end]),
+        seed=None if seed < 0 else seed,
+    )
+    return record, end + 1
+
+
+def read_records(stream: BinaryIO, chunk_size: int = 1 << 16) -> Iterator[GameRecord]:
+    data = b""
+    pos = 0
+    while chunk := stream.read(chunk_size):
+        data = data[pos:] + chunk
+        pos = 0
+        while parsed := parse_record(data, pos):
+            record, pos = parsed
+            yield record
+    if pos < len(data):
+        raise ValueError("truncated game record")
@@ -0,0 +1,435 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import random
+from random import Random
+
+from src.const.symbols import BoardSymbol
+from src.logic.core.utils import Connectivity, Point
+
+# Edge planes: one bit per link, keyed by the top-left cell of the link's bounding box.
+HORIZONTAL, VERTICAL, DIAGONAL, ANTI_DIAGONAL = range(4)
+
+DIRECTIONS = {
+    (0, -1): BoardSymbol.Connection.TOP,
+    (0, 1): BoardSymbol.Connection.BOTTOM,
+    (-1, 0): BoardSymbol.Connection.LEFT,
+    (1, 0): BoardSymbol.Connection.RIGHT,
+    (-1, -1): BoardSymbol.Connection.TOP_LEFT,
+    (1, -1): BoardSymbol.Connection.TOP_RIGHT,
+    (-1, 1): BoardSymbol.Connection.BOTTOM_LEFT,
+    (1, 1): BoardSymbol.Connection.BOTTOM_RIGHT,
+}
+DIRECTION_DELTAS = list(DIRECTIONS)
+DIRECTION_NAMES = list(DIRECTIONS.values())
+
+# plane of the link made by a move, offset of its bit from the start cell, and the plane of the
+# link that would cross it inside the same 2x2 box
+LINK_PLANES = {
+    (1, 0): (HORIZONTAL, 0, 0, None),
+    (-1, 0): (HORIZONTAL, -1, 0, None),
+    (0, 1): (VERTICAL, 0, 0, None),
+    (0, -1): (VERTICAL, 0, -1, None),
+    (1, 1): (DIAGONAL, 0, 0, ANTI_DIAGONAL),
+    (-1, -1): (DIAGONAL, -1, -1, ANTI_DIAGONAL),
+    (1, -1): (ANTI_DIAGONAL, 0, -1, DIAGONAL),
+    (-1, 1): (ANTI_DIAGONAL, -1, 0, DIAGONAL),
+}
+
+# Moves are ints: `end_cell << 1 | 1` when played from the tail, `end_cell << 1` from the head.
+# move_code() turns one into a 4-bit (end, direction) code that does not depend on the board size.
+TAIL = 1
+
+
+@lru_cache(maxsize=None)
+def board_masks(width: int, height: int) -> tuple[int, int, int]:
+    full = (1 << (width * height)) - 1
+    left_column = sum(1 << (y * width) for y in range(height))
+    right_column = left_column << (width - 1)
+    return full, full & ~left_column, full & ~right_column
+
+
+@dataclass(frozen=True, slots=True)
+class Neighbour:
+    code: int
+    offset: int
+    plane: int
+    bit: int  # relative to the start cell
+    cross_plane: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class Neighbourhood:
+    neighbours: tuple[Neighbour, ...]
+    by_offset: dict[int, Neighbour]
+    by_code: tuple[Neighbour | None, ...]
+    walk: tuple[tuple[int, int | None, int], ...]  # (offset, cross_plane, bit) for move generation
+
+
+# Which neighbours exist only depends on the borders a cell touches, so a board size needs 16 tables
+# indexed by `left | right << 1 | top << 2 | bottom << 3` instead of one per cell.
+@lru_cache(maxsize=None)
+def neighbourhoods(width: int, height: int) -> tuple[Neighbourhood, ...]:
+    tables = []
+    for border in range(16):
+        left, right, top, bottom = border & 1, border & 2, border & 4, border & 8
+        by_code = []
+        for code, (dx, dy) in enumerate(DIRECTION_DELTAS):
+            if (dx < 0 and left) or (dx > 0 and right) or (dy < 0 and top) or (dy > 0 and bottom):
+                by_code.append(None)
+                continue
+            plane, bit_x, bit_y, cross_plane = LINK_PLANES[(dx, dy)]
+            by_code.append(Neighbour(code, dy * width + dx, plane, bit_y * width + bit_x, cross_plane))
+        neighbours = tuple(neighbour for neighbour in by_code if neighbour)
+        tables.append(
+            Neighbourhood(
+                neighbours=neighbours,
+                by_offset={neighbour.offset: neighbour for neighbour in neighbours},
+                by_code=tuple(by_code),
+                walk=tuple((neighbour.offset, neighbour.cross_plane, neighbour.bit) for neighbour in neighbours),
+            )
+        )
+    return tuple(tables)
+
+
+def encode_move(from_head: bool, end: int) -> int:
+    return end << 1 | (not from_head)
+
+
+def decode_move(move: int) -> tuple[bool, int]:
+    return not move & TAIL, move >> 1
+
+
+def iter_bits(mask: int):
+    if mask.bit_length() > 512 and mask.bit_count() > 16:
+        # clearing a bit of a huge int copies all of it, so dense masks are walked in 64-bit words instead
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        for offset in range(0, len(data), 8):
+            word = int.from_bytes(data[offset : offset + 8], "little")
+            while word:
+                low = word & -word
+                yield offset * 8 + low.bit_length() - 1
+                word ^= low
+        return
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class GameState:
+    """Rules of the game without any rendering: walls, connected nodes, links, head/tail and turn order.
+
+    Cells are numbered ``y * width + x`` and every per-cell flag is a Python int used as a bitboard,
+    so copying a state is copying a handful of integers.
+    """
+
+    __slots__ = (
+        "width",
+        "height",
+        "table",
+        "anchor",
+        "players",
+        "current_player",
+        "walls",
+        "connected",
+        "planes",
+        "head_cell",
+        "tail_cell",
+        "head_targets",
+        "tail_targets",
+        "version",
+        "ply",
+    )
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        anchor: Point,
+        walls: list[Point] = None,
+        players: int = 2,
+    ):
+        self.width = width
+        self.height = height
+        self.table = neighbourhoods(width, height)
+        self.anchor = anchor
+        self.players = players
+        self.current_player = 0
+
+        anchor_cell = self.index(anchor)
+        self.walls = 0
+        for wall in walls or ():
+            self.walls |= 1 << self.index(wall)
+        self.walls &= ~(1 << anchor_cell)
+        self.connected = 1 << anchor_cell
+        self.planes = [0, 0, 0, 0]
+
+        self.head_cell = anchor_cell
+        self.tail_cell = anchor_cell
+        self.head_targets = self.tail_targets = self.targets(anchor_cell)
+        self.version = 0
+        self.ply = 0
+
+    @classmethod
+    def random(
+        cls,
+        width: int,
+        height: int,
+        anchor: Point = None,
+        wall_density: float = 0.05,
+        players: int = 2,
+        rng: Random = None,
+    ) -> "GameState":
+        rng = rng or random
+        anchor = anchor if anchor else Point(rng.randint(0, width - 1), rng.randint(0, height - 1))
+        cells = rng.choices([True, False], [wall_density, 1 - wall_density], k=width * height)
+        walls = [Point(cell % width, cell // width) for cell, wall in enumerate(cells) if wall]
+        return cls(width=width, height=height, anchor=anchor, walls=walls, players=players)
+
+    def copy(self) -> "GameState":
+        other = GameState.__new__(GameState)
+        for attr in self.__slots__:
+            setattr(other, attr, getattr(self, attr))
+        other.planes = self.planes[:]
+        return other
+
+    def index(self, point: Point) -> int:
+        return point.y * self.width + point.x
+
+    def point(self, cell: int) -> Point:
+        return Point(cell % self.width, cell // self.width)
+
+    @property
+    def head(self) -> Point:
+        return self.point(self.head_cell)
+
+    @property
+    def tail(self) -> Point:
+        return self.point(self.tail_cell)
+
+    @property
+    def empty(self) -> int:
+        return board_masks(self.width, self.height)[0] & ~(self.walls | self.connected)
+
+    def in_bounds(self, point: Point) -> bool:
+        return 0 <= point.x < self.width and 0 <= point.y < self.height
+
+    def is_wall(self, point: Point) -> bool:
+        return bool(self.walls >> self.index(point) & 1)
+
+    def is_connected(self, point: Point) -> bool:
+        return bool(self.connected >> self.index(point) & 1)
+
+    def neighbourhood(self, cell: int) -> Neighbourhood:
+        y, x = divmod(cell, self.width)
+        return self.table[(x == 0) | (x == self.width - 1) << 1 | (y == 0) << 2 | (y == self.height - 1) << 3]
+
+    def edge(self, a: int, b: int) -> tuple[int, int] | None:
+        neighbour = self.neighbourhood(a).by_offset.get(b - a)
+        return (neighbour.plane, a + neighbour.bit) if neighbour else None
+
+    def is_linked(self, a: Point, b: Point) -> bool:
+        edge = self.edge(self.index(a), self.index(b))
+        return bool(edge) and bool(self.planes[edge[0]] >> edge[1] & 1)
+
+    def crossing(self, start: Point, end: Point) -> bool:
+        if start.x == end.x or start.y == end.y:
+            return False
+        return self.is_linked(Point(start.x, end.y), Point(end.x, start.y))
+
+    def targets(self, cell: int) -> int:
+        if not self.connected >> cell & 1:
+            return 0
+        blocked = self.walls | self.connected
+        planes = self.planes
+        targets = 0
+        for offset, cross_plane, bit in self.neighbourhood(cell).walk:
+            # a diagonal move is blocked by the link between the two other corners of its 2x2 box
+            if blocked >> (cell + offset) & 1:
+                continue
+            if cross_plane is None or not planes[cross_plane] >> (cell + bit) & 1:
+                targets |= 1 << (cell + offset)
+        return targets
+
+    def direction(self, start: int, end: int) -> str:
+        return DIRECTION_NAMES[self.neighbourhood(start).by_offset[end - start].code]
+
+    def adjacent(self, a: int, b: int) -> bool:
+        return a == b or b - a in self.neighbourhood(a).by_offset
+
+    def cached_targets(self, cell: int) -> int:
+        if cell == self.head_cell:
+            return self.head_targets
+        if cell == self.tail_cell:
+            return self.tail_targets
+        return self.targets(cell)
+
+    def possible_connections(self, point: Point = None) -> list[Connectivity]:
+        start = self.index(point) if point else self.head_cell
+        start_point = self.point(start)
+        return [
+            Connectivity(
+                value=self.direction(start, end),
+                possible=True,
+                start=start_point,
+                end=self.point(end),
+                from_head=start == self.head_cell,
+                from_tail=start == self.tail_cell,
+            )
+            for end in iter_bits(self.cached_targets(start))
+        ]
+
+    def available_moves(self) -> list[Connectivity]:
+        available_moves = self.possible_connections(self.head)
+        if self.tail_cell != self.head_cell:
+            available_moves += self.possible_connections(self.tail)
+        return available_moves
+
+    def can_connect(self, start: Point, end: Point) -> bool:
+        return bool(self.cached_targets(self.index(start)) >> self.index(end) & 1)
+
+    def _link(self, start: int, end: int) -> None:
+        plane, bit = self.edge(start, end)
+        self.planes[plane] |= 1 << bit
+        self.connected |= 1 << end
+        self.current_player = (self.current_player + 1) % self.players
+        self.version += 1
+        self.ply += 1
+
+    # Only the moved end and an end sitting next to the new node can see their targets change.
+    def _move_head(self, end: int) -> None:
+        self._link(self.head_cell, end)
+        self.head_cell = end
+        self.head_targets = self.targets(end)
+        if self.adjacent(self.tail_cell, end):
+            self.tail_targets = self.targets(self.tail_cell)
+
+    def _move_tail(self, end: int) -> None:
+        self._link(self.tail_cell, end)
+        self.tail_cell = end
+        self.tail_targets = self.targets(end)
+        if self.adjacent(self.head_cell, end):
+            self.head_targets = self.targets(self.head_cell)
+
+    def legal_moves(self) -> list[int]:
+        moves = [end << 1 for end in iter_bits(self.head_targets)]
+        if self.tail_cell != self.head_cell:
+            moves += [end << 1 | TAIL for end in iter_bits(self.tail_targets)]
+        return moves
+
+    def is_legal(self, move: int) -> bool:
+        targets = self.tail_targets if move & TAIL else self.head_targets
+        return bool(targets >> (move >> 1) & 1)
+
+    def apply_move(self, move: int) -> tuple:
+        from_head, end = decode_move(move)
+        record = (
+            from_head,
+            self.head_cell if from_head else self.tail_cell,
+            end,
+            self.head_targets,
+            self.tail_targets,
+        )
+        if from_head:
+            self._move_head(end)
+        else:
+            self._move_tail(end)
+        return record
+
+    def move_code(self, move: int) -> int:
+        from_head, end = decode_move(move)
+        start = self.head_cell if from_head else self.tail_cell
+        return (move & TAIL) << 3 | self.neighbourhood(start).by_offset[end - start].code
+
+    def move_from_code(self, code: int) -> int | None:
+        start = self.tail_cell if code >> 3 & TAIL else self.head_cell
+        neighbour = self.neighbourhood(start).by_code[code & 7]
+        if not neighbour:
+            return None
+        return (start + neighbour.offset) << 1 | (code >> 3 & TAIL)
+
+    def undo_move(self, record: tuple) -> None:
+        from_head, start, end, self.head_targets, self.tail_targets = record
+        plane, bit = self.edge(start, end)
+        self.planes[plane] &= ~(1 << bit)
+        self.connected &= ~(1 << end)
+        if from_head:
+            self.head_cell = start
+        else:
+            self.tail_cell = start
+        self.current_player = (self.current_player - 1) % self.players
+        # version never goes back so that caches keyed on it can't resurrect a stale position
+        self.version += 1
+        self.ply -= 1
+
+    def connectivity(self, move: int) -> Connectivity:
+        from_head, end = decode_move(move)
+        start = self.head_cell if from_head else self.tail_cell
+        return Connectivity(
+            value=self.direction(start, end),
+            possible=True,
+            start=self.point(start),
+            end=self.point(end),
+            from_head=from_head or start == self.head_cell,
+            from_tail=not from_head or start == self.tail_cell,
+        )
+
+    def connect_head(self, connectivity: Connectivity) -> bool:
+        end = self.index(connectivity.end)
+        if not self.head_targets >> end & 1:
+            return False
+        self._move_head(end)
+        return True
+
+    def connect_tail(self, connectivity: Connectivity) -> bool:
+        end = self.index(connectivity.end)
+        if not self.tail_targets >> end & 1:
+            return False
+        self._move_tail(end)
+        return True
+
+    def display_as_text(self):
+        print("  ", end="")
+        for i in range(self.width):
+            print(i, end=" ")
+        print()
+        for y in range(self.height):
+            print(y, end=" ")
+            for x in range(self.width):
+                cell = y * self.width + x
+                if cell == self.head_cell:
+                    symbol = "H"
+                elif cell == self.tail_cell:
+                    symbol = "T"
+                elif self.walls >> cell & 1:
+                    symbol = "W"
+                else:
+                    symbol = BoardSymbol.Node.FILLED if self.connected >> cell & 1 else BoardSymbol.Node.EMPTY
+                print(symbol, end=" ")
+            print()
+        print()
+
+    @property
+    def is_over(self) -> bool:
+        return not (self.head_targets or self.tail_targets)
+
+    @property
+    def loser(self) -> int | None:
+        return self.current_player if self.is_over else None
+
+    def random_simulation(self, moves: list[int] = None, rng: Random = None) -> None:
+        # head moves first; the moves played are appended to `moves` when given
+        choice = (rng or random).choice
+        while True:
+            if self.head_targets:
+                end = choice(list(iter_bits(self.head_targets)))
+                self._move_head(end)
+                if moves is not None:
+                    moves.append(end << 1)
+            elif self.tail_targets:
+                end = choice(list(iter_bits(self.tail_targets)))
+                self._move_tail(end)
+                if moves is not None:
+                    moves.append(end << 1 | TAIL)
+            else:
+                return
@@ -0,0 +1,122 @@
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+
+from src.logic.core.state import ANTI_DIAGONAL, DIAGONAL, HORIZONTAL, LINK_PLANES, TAIL, VERTICAL, GameState, iter_bits
+
+# The rules only look at neighbours and at the link crossing a diagonal, so the 8 symmetries of the square
+# map games onto games. A symmetry is a transpose, then a mirror of x, then a mirror of y; on a rectangle the
+# transposed ones map onto the board turned on its side, which is why the canonical key includes the size.
+TRANSPOSE, MIRROR_X, MIRROR_Y = 1, 2, 4
+SYMMETRIES = range(8)
+
+PLANE_DIRECTIONS = {HORIZONTAL: (1, 0), VERTICAL: (0, 1), DIAGONAL: (1, 1), ANTI_DIAGONAL: (1, -1)}
+KEY_HEADER = struct.Struct("<HHBII")  # width, height, players, head cell, tail cell
+
+
+@dataclass(frozen=True, slots=True)
+class Symmetry:
+    width: int  # of the transformed board
+    height: int
+    cells: tuple[int, ...]  # cell -> transformed cell
+    inverse: tuple[int, ...]
+    planes: tuple[tuple[int, tuple[int, ...]], ...]  # per plane: transformed plane, link bit -> transformed bit
+
+
+def _link_ends(plane: int, bit: int, width: int, height: int) -> tuple[int, int] | None:
+    # links are keyed by the top-left cell of their 2x2 box, see LINK_PLANES
+    y, x = divmod(bit, width)
+    right, down = x < width - 1, y < height - 1
+    if plane == HORIZONTAL:
+        return (bit, bit + 1) if right else None
+    if plane == VERTICAL:
+        return (bit, bit + width) if down else None
+    if not (right and down):
+        return None
+    return (bit, bit + width + 1) if plane == DIAGONAL else (bit + 1, bit + width)
+
+
+def _link_bit(a: int, b: int, width: int) -> int:
+    (ay, ax), (by, bx) = divmod(a, width), divmod(b, width)
+    _, bit_x, bit_y, _ = LINK_PLANES[(bx - ax, by - ay)]
+    return a + bit_y * width + bit_x
+
+
+@lru_cache(maxsize=None)
+def symmetries(width: int, height: int) -> tuple[Symmetry, ...]:
+    found = []
+    for symmetry in SYMMETRIES:
+        new_width, new_height = (height, width) if symmetry & TRANSPOSE else (width, height)
+
+        def apply(x: int, y: int) -> tuple[int, int]:
+            # on vectors; cells are shifted back onto the board afterwards
+            if symmetry & TRANSPOSE:
+                x, y = y, x
+            return (-x if symmetry & MIRROR_X else x), (-y if symmetry & MIRROR_Y else y)
+
+        cells = []
+        for cell in range(width * height):
+            x, y = apply(cell % width, cell // width)
+            x += new_width - 1 if symmetry & MIRROR_X else 0
+            y += new_height - 1 if symmetry & MIRROR_Y else 0
+            cells.append(y * new_width + x)
+        inverse = [0] * len(cells)
+        for cell, image in enumerate(cells):
+            inverse[image] = cell
+
+        planes = []
+        for plane, direction in PLANE_DIRECTIONS.items():
+            dx, dy = apply(*direction)
+            target = LINK_PLANES[(dx, dy)][0]
+            bits = []
+            for bit in range(width * height):
+                ends = _link_ends(plane, bit, width, height)
+                bits.append(_link_bit(cells[ends[0]], cells[ends[1]], new_width) if ends else -1)
+            planes.append((target, tuple(bits)))
+        found.append(Symmetry(new_width, new_height, tuple(cells), tuple(inverse), tuple(planes)))
+    return tuple(found)
+
+
+def transform_mask(mask: int, table: tuple[int, ...]) -> int:
+    image = 0
+    for cell in iter_bits(mask):
+        image |= 1 << table[cell]
+    return image
+
+
+def transform_move(move: int, symmetry: Symmetry) -> int:
+    return symmetry.cells[move >> 1] << 1 | move & TAIL
+
+
+def restore_move(move: int, symmetry: Symmetry) -> int:
+    return symmetry.inverse[move >> 1] << 1 | move & TAIL
+
+
+def canonical(state: GameState) -> tuple[bytes, Symmetry]:
+    """The smallest key among the symmetric images of ``state`` and the symmetry that produces it.
+
+    Symmetric positions share a key, so anything stored under it holds for all of them once moves are
+    mapped with ``transform_move``/``restore_move``.
+    """
+    best = None
+    for symmetry in symmetries(state.width, state.height):
+        planes = [0, 0, 0, 0]
+        for links, (target, bits) in zip(state.planes, symmetry.planes):
+            planes[target] = transform_mask(links, bits)
+        image = (
+            symmetry.width,
+            symmetry.height,
+            symmetry.cells[state.head_cell],
+            symmetry.cells[state.tail_cell],
+            transform_mask(state.walls, symmetry.cells),
+            transform_mask(state.connected, symmetry.cells),
+            *planes,
+        )
+        if best is None or image < best[0]:
+            best = image, symmetry
+    (width, height, head, tail, *masks), symmetry = best
+    size = (width * height + 7) // 8
+    key = KEY_HEADER.pack(width, height, state.players, head, tail) + b"".join(
+        mask.to_bytes(size, "little") for mask in masks
+    )
+    return key, symmetry
@@ -1,11 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.logic.ai.mcts import MCTSPlayer
 
 
 def flatten(l):
     return [item for sublist in l for item in sublist]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Point:
     x: int
     y: int
@@ -13,9 +17,6 @@ class Point:
     def __repr__(self) -> str:
         return f"({self.x}, {self.y})"
 
-    def __eq__(self, other: "Point") -> bool:
-        return self.x == other.x and self.y == other.y
-
     @classmethod
     def from_tuple(cls, t: tuple) -> "Point":
         return cls(t[0], t[1])
@@ -25,34 +26,33 @@ class Point:
         return (self.x, self.y)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PlayerVisual:
     name: str
     connection_color: tuple
     turn: bool = False
     lost: bool = False
+    ai: "MCTSPlayer | None" = None
 
     def __repr__(self) -> str:
         return f"{self.name}"
 
 
-@dataclass
+# equal and hashed by (start, end) only
+@dataclass(frozen=True, slots=True)
 class Connectivity:
-    value: str
-    possible: bool
+    value: str = field(compare=False)
+    possible: bool = field(compare=False)
     start: Point
     end: Point
-    from_head: bool = False
-    from_tail: bool = False
+    from_head: bool = field(default=False, compare=False)
+    from_tail: bool = field(default=False, compare=False)
 
     def __repr__(self) -> str:
         return f"{self.value} {self.end}"
 
-    def __eq__(self, other: "Connectivity") -> bool:
-        return self.start == other.start and self.end == other.end
-
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NodeVisual:
     SCALE_FACTOR: int = 40
     NODE_RADIUS: int = 20
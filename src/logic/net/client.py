@@ -0,0 +1,57 @@
+import asyncio
+
+from src.logic.core.record import parse_record
+from src.logic.core.state import GameState
+from src.logic.net import protocol
+from src.logic.net.protocol import frame, read_frame
+
+
+class Client:
+    """Loopback/bot client that mirrors the game state from the server's move deltas."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.game_id: int = None
+        self.seat: int = None
+        self.state: GameState = None
+        self.loser: int | None = None
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 7878) -> "Client":
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def create(self, width: int, height: int, players: int = 2, wall_density: float = 0.05, seed: int = None):
+        payload = protocol.CREATE_PAYLOAD.pack(width, height, players, wall_density, -1 if seed is None else seed)
+        await self.send(protocol.CREATE, payload)
+        await self.receive()
+
+    async def join(self, game_id: int) -> None:
+        await self.send(protocol.JOIN, protocol.JOIN_PAYLOAD.pack(game_id))
+        await self.receive()
+
+    async def move(self, move: int) -> None:
+        await self.send(protocol.MOVE, protocol.MOVE_PAYLOAD.pack(self.state.move_code(move)))
+
+    async def send(self, kind: int, payload: bytes) -> None:
+        self.writer.write(frame(kind, payload))
+        await self.writer.drain()
+
+    async def receive(self) -> tuple[int, bytes]:
+        kind, payload = await read_frame(self.reader)
+        if kind == protocol.JOINED:
+            self.game_id, self.seat = protocol.JOINED_PAYLOAD.unpack_from(payload)
+            record, _ = parse_record(payload, protocol.JOINED_PAYLOAD.size)
+            self.state = record.final_state()
+        elif kind == protocol.MOVED:
+            _, code = protocol.MOVED_PAYLOAD.unpack(payload)
+            self.state.apply_move(self.state.move_from_code(code))
+        elif kind == protocol.OVER:
+            (self.loser,) = protocol.OVER_PAYLOAD.unpack(payload)
+        elif kind == protocol.ERROR:
+            raise protocol.ProtocolError(protocol.ERROR_PAYLOAD.unpack(payload)[0])
+        return kind, payload
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
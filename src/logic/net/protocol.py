@@ -0,0 +1,40 @@
+import asyncio
+import struct
+
+# Every message is a 3-byte frame header (type, payload length) followed by the payload.
+# Moves travel as the 4-bit (end, direction) code from GameState.move_code, one byte each.
+FRAME = struct.Struct("<BH")
+
+# client -> server
+CREATE = ord("C")  # CREATE_PAYLOAD
+JOIN = ord("J")  # JOIN_PAYLOAD
+MOVE = ord("M")  # MOVE_PAYLOAD
+
+# server -> client
+JOINED = ord("G")  # JOINED_PAYLOAD followed by the game record so far
+MOVED = ord("m")  # MOVED_PAYLOAD, broadcast to every seat
+OVER = ord("O")  # OVER_PAYLOAD
+ERROR = ord("E")  # ERROR_PAYLOAD
+
+CREATE_PAYLOAD = struct.Struct("<HHBfq")  # width, height, players, wall density, seed (-1: random)
+JOIN_PAYLOAD = struct.Struct("<I")  # game id
+MOVE_PAYLOAD = struct.Struct("<B")  # move code
+JOINED_PAYLOAD = struct.Struct("<IB")  # game id, seat
+MOVED_PAYLOAD = struct.Struct("<BB")  # seat, move code
+OVER_PAYLOAD = struct.Struct("<B")  # losing seat
+ERROR_PAYLOAD = struct.Struct("<B")
+
+BAD_MESSAGE, UNKNOWN_GAME, GAME_FULL, NOT_SEATED, NOT_YOUR_TURN, ILLEGAL_MOVE = range(1, 7)
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def frame(kind: int, payload: bytes = b"") -> bytes:
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length) if length else b""
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import itertools
+import random
+import struct
+from dataclasses import replace
+
+from src.logic.core.record import GameRecord
+from src.logic.core.state import TAIL, GameState
+from src.logic.net import protocol
+from src.logic.net.protocol import frame, read_frame
+
+
+class Room:
+    """One authoritative game: the headless state, the seats and the move codes played so far."""
+
+    __slots__ = ("game_id", "state", "setup", "codes", "seats")
+
+    def __init__(self, game_id: int, state: GameState, seed: int):
+        self.game_id = game_id
+        self.state = state
+        self.setup = GameRecord.setup(state, seed)
+        self.codes = bytearray()
+        self.seats: list[asyncio.StreamWriter | None] = [None] * state.players
+
+    def record(self) -> GameRecord:
+        return replace(self.setup, codes=bytes(self.codes))
+
+    def broadcast(self, message: bytes) -> None:
+        for writer in self.seats:
+            if writer:
+                writer.write(message)
+
+
+class GameServer:
+    """Hosts any number of games in one event loop; every connection holds one seat of one game."""
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.rooms: dict[int, Room] = {}
+        self.ids = itertools.count(1)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 7878) -> asyncio.Server:
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        room, seat = None, None
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                try:
+                    if kind == protocol.CREATE and room is None:
+                        room, seat = self.create(*protocol.CREATE_PAYLOAD.unpack(payload)), 0
+                        self.sit(room, seat, writer)
+                    elif kind == protocol.JOIN and room is None:
+                        (game_id,) = protocol.JOIN_PAYLOAD.unpack(payload)
+                        room, seat = self.join(game_id, writer)
+                    elif kind == protocol.MOVE and room is not None:
+                        (code,) = protocol.MOVE_PAYLOAD.unpack(payload)
+                        self.move(room, seat, code)
+                    else:
+                        raise protocol.ProtocolError(protocol.NOT_SEATED if room is None else protocol.BAD_MESSAGE)
+                except struct.error:
+                    writer.write(frame(protocol.ERROR, protocol.ERROR_PAYLOAD.pack(protocol.BAD_MESSAGE)))
+                except protocol.ProtocolError as error:
+                    writer.write(frame(protocol.ERROR, protocol.ERROR_PAYLOAD.pack(error.args[0])))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if room is not None:
+                self.leave(room, seat)
+            writer.close()
+
+    def create(self, width: int, height: int, players: int, wall_density: float, seed: int) -> Room:
+        valid_size = 1 <= width <= self.max_size and 1 <= height <= self.max_size
+        if not (valid_size and 1 <= players <= 8 and 0 <= wall_density <= 1):
+            raise protocol.ProtocolError(protocol.BAD_MESSAGE)
+        seed = seed if seed >= 0 else random.getrandbits(63)
+        state = GameState.random(width, height, wall_density=wall_density, players=players, rng=random.Random(seed))
+        room = Room(next(self.ids), state, seed)
+        self.rooms[room.game_id] = room
+        return room
+
+    def join(self, game_id: int, writer: asyncio.StreamWriter) -> tuple[Room, int]:
+        room = self.rooms.get(game_id)
+        if room is None:
+            raise protocol.ProtocolError(protocol.UNKNOWN_GAME)
+        if None not in room.seats:
+            raise protocol.ProtocolError(protocol.GAME_FULL)
+        seat = room.seats.index(None)
+        self.sit(room, seat, writer)
+        return room, seat
+
+    def sit(self, room: Room, seat: int, writer: asyncio.StreamWriter) -> None:
+        room.seats[seat] = writer
+        payload = protocol.JOINED_PAYLOAD.pack(room.game_id, seat) + room.record().to_bytes()
+        writer.write(frame(protocol.JOINED, payload))
+
+    def move(self, room: Room, seat: int, code: int) -> None:
+        # the legality check is a lookup in the neighbour table plus one bit test on the target masks
+        state = room.state
+        if state.current_player != seat:
+            raise protocol.ProtocolError(protocol.NOT_YOUR_TURN)
+        move = state.move_from_code(code) if code < 16 else None
+        if move is None or not state.is_legal(move):
+            raise protocol.ProtocolError(protocol.ILLEGAL_MOVE)
+        if state.tail_cell == state.head_cell and move & TAIL:
+            # both ends share the anchor and legal_moves() only offers it as a head move; store and send that
+            move ^= TAIL
+            code = state.move_code(move)
+        state.apply_move(move)
+        room.codes.append(code)
+        room.broadcast(frame(protocol.MOVED, protocol.MOVED_PAYLOAD.pack(seat, code)))
+        if state.is_over:
+            room.broadcast(frame(protocol.OVER, protocol.OVER_PAYLOAD.pack(state.loser)))
+
+    def leave(self, room: Room, seat: int) -> None:
+        room.seats[seat] = None
+        if not any(room.seats):
+            del self.rooms[room.game_id]
+
+
+async def run(host: str, port: int) -> None:
+    server = await GameServer().serve(host, port)
+    print(f"serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+    async with server:
+        await server.serve_forever()
+
+
+def cli(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Host headless games for network clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7878)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host, args.port))
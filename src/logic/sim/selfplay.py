@@ -0,0 +1,151 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+
+from src.logic.core.record import GameRecord
+from src.logic.core.state import GameState
+
+FIELDS = ["width", "height", "wall_density", "players", "seed", "games", "moves", "first_player_wins", "losses"]
+
+
+@dataclass
+class SelfPlayBatch:
+    width: int
+    height: int
+    wall_density: float
+    players: int
+    seed: int
+    games: int
+
+
+def play_batch(batch: SelfPlayBatch, record: bool = False) -> dict:
+    # every game gets its own seed, so a single game can be regenerated from its record
+    seeds = random.Random(batch.seed)
+    losses = [0] * batch.players
+    moves = 0
+    records = bytearray()
+    for _ in range(batch.games):
+        seed = seeds.getrandbits(63)
+        rng = random.Random(seed)
+        state = GameState.random(
+            width=batch.width, height=batch.height, wall_density=batch.wall_density, players=batch.players, rng=rng
+        )
+        played = [] if record else None
+        state.random_simulation(played, rng)
+        if record:
+            records += GameRecord.from_moves(state, played, seed).to_bytes()
+        losses[state.current_player] += 1
+        moves += state.ply
+    result = {
+        **asdict(batch),
+        "moves": moves,
+        "first_player_wins": batch.games - losses[0],
+        "losses": losses,
+    }
+    if record:
+        result["records"] = bytes(records)
+    return result
+
+
+def make_batches(
+    games: int,
+    sizes: list[tuple[int, int]],
+    wall_densities: list[float],
+    players: list[int],
+    seed: int = 0,
+    batch_size: int = 1000,
+) -> list[SelfPlayBatch]:
+    batches = []
+    for (width, height), wall_density, player_count in itertools.product(sizes, wall_densities, players):
+        for start in range(0, games, batch_size):
+            batches.append(
+                SelfPlayBatch(
+                    width=width,
+                    height=height,
+                    wall_density=wall_density,
+                    players=player_count,
+                    seed=seed * 1_000_003 + len(batches),
+                    games=min(batch_size, games - start),
+                )
+            )
+    return batches
+
+
+def run_selfplay(batches: list[SelfPlayBatch], workers: int = None, record: bool = False):
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for future in as_completed([pool.submit(play_batch, batch, record) for batch in batches]):
+            yield future.result()
+
+
+def write_results(results, out, fmt: str = "jsonl", records=None) -> dict:
+    totals = {}
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS)
+        writer.writeheader()
+
+    for result in results:
+        if "records" in result:
+            records.write(result.pop("records"))
+        if writer:
+            writer.writerow({**result, "losses": " ".join(map(str, result["losses"]))})
+        else:
+            out.write(json.dumps(result) + "\n")
+        out.flush()
+
+        key = (result["width"], result["height"], result["wall_density"], result["players"])
+        games, wins = totals.get(key, (0, 0))
+        totals[key] = (games + result["games"], wins + result["first_player_wins"])
+    return totals
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+
+def cli(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Play random self-play games on all cores and stream the stats.")
+    parser.add_argument("--games", type=int, default=10_000, help="games per configuration")
+    parser.add_argument("--sizes", type=lambda s: [parse_size(v) for v in s.split(",")], default=[(4, 4)])
+    parser.add_argument("--wall-densities", type=lambda s: [float(v) for v in s.split(",")], default=[0.05])
+    parser.add_argument("--players", type=lambda s: [int(v) for v in s.split(",")], default=[2])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--out", default="-", help="output file, '-' for stdout")
+    parser.add_argument("--record", help="append every game to this binary record file")
+    args = parser.parse_args(argv)
+
+    batches = make_batches(
+        games=args.games,
+        sizes=args.sizes,
+        wall_densities=args.wall_densities,
+        players=args.players,
+        seed=args.seed,
+        batch_size=args.batch_size,
+    )
+    out = sys.stdout if args.out == "-" else open(args.out, "w", newline="")
+    records = open(args.record, "ab") if args.record else None
+    try:
+        results = run_selfplay(batches, workers=args.workers, record=bool(records))
+        totals = write_results(results, out, fmt=args.format, records=records)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if records:
+            records.close()
+
+    for (width, height, wall_density, players), (games, wins) in sorted(totals.items()):
+        print(
+            f"{width}x{height} walls={wall_density} players={players}: "
+            f"first player won {wins}/{games} ({wins / games:.1%})",
+            file=sys.stderr,
+        )
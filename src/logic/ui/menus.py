@@ -1,9 +1,16 @@
+import functools
+import os
+import time
+from typing import Callable
+
 import pygame
 import pygame.freetype
-import pygame_menu
 from src.const.colors import GameColors
+from src.logic.ai.book import OpeningBook
+from src.logic.ai.mcts import MCTSPlayer
 from src.logic.core.board import Board
-from pygame_menu import themes
+from src.logic.core.profiling import FrameProfiler
+from src.logic.core.record import GameRecord, RecordWriter
 
 from src.logic.core.utils import PlayerVisual
 from src.logic.core.utils import Point
@@ -16,45 +23,106 @@ class Game:
     FIELD_X = 4
     FIELD_Y = 4
 
-    def __init__(self):
+    MIN_ZOOM = 0.5
+    PAN_STEP = 0.2  # share of the window moved per arrow key press
+    PAN_KEYS = {pygame.K_LEFT: (1, 0), pygame.K_RIGHT: (-1, 0), pygame.K_UP: (0, 1), pygame.K_DOWN: (0, -1)}
+
+    AI_SEATS = ()  # names of computer-controlled players, also set with LINES_AI_SEATS=Pylyp,Steve
+    AI_BUDGET_MS = 400
+
+    FPS = 120
+    TICK_MS = 1000 // 60
+    MAX_TICKS_PER_FRAME = 5
+    IDLE_WAIT_MS = 500
+
+    RECORD_PATH = "games.lpg"
+    BOOK_PATH = "book.sqlite"  # built with `main.py solve --book`, used by the AI seats when present
+
+    def __init__(
+        self,
+        seed: int = None,
+        started: float = None,
+        on_startup: Callable[[dict[str, float]], None] = None,
+        ai_seats: tuple[str, ...] = None,
+    ):
+        # `started` is a time.perf_counter() reading taken by the caller, e.g. before its imports
+        self.started = time.perf_counter() if started is None else started
+        self.startup: dict[str, float] = {}
         pygame.init()
-        pygame.font.init()
         pygame.display.set_caption("Litterally Pen Game")
 
-        self.surface = pygame.display.set_mode((self.DIMX, self.DIMY))
-        self.bg = pygame.image.load("assets/grid.jpg").convert()
-
-        self.mainmenu = pygame_menu.Menu("Litterally Pen Game", self.DIMX, self.DIMY, theme=themes.THEME_BLUE)
-        self.action_phase = pygame_menu.Menu("Action Phase", self.DIMX, self.DIMY, theme=themes.THEME_BLUE)
+        self.surface = pygame.display.set_mode((self.DIMX, self.DIMY), pygame.RESIZABLE)
 
-        self.font = pygame.freetype.SysFont("FantasqueSansM Nerd Font Propo", 15)
         self.is_ap = False
         self.clock = pygame.time.Clock()
-        self.buld_main_menu()
-        self.build_action_phase()
+        self.profiler = FrameProfiler.from_env()
+        self.on_startup = on_startup or self.profiler.startup
+        if ai_seats is None:
+            ai_seats = tuple(name for name in os.environ.get("LINES_AI_SEATS", "").split(",") if name) or self.AI_SEATS
+        book = OpeningBook(self.BOOK_PATH) if ai_seats and os.path.exists(self.BOOK_PATH) else None
         self.board = Board(
             height=self.FIELD_Y,
             width=self.FIELD_X,
             surface=self.surface,
+            profiler=self.profiler,
+            seed=seed,
             players=[
-                PlayerVisual(name="Shuri", connection_color=GameColors.DARK_GREEN),
-                PlayerVisual(name="Steve", connection_color=GameColors.ORANGE),
-                PlayerVisual(name="Chen", connection_color=GameColors.BURGUNDY),
-                PlayerVisual(name="Pylyp", connection_color=GameColors.DARK_BLUE),
+                PlayerVisual(
+                    name=name,
+                    connection_color=color,
+                    ai=MCTSPlayer(budget_ms=self.AI_BUDGET_MS, book=book) if name in ai_seats else None,
+                )
+                for name, color in [
+                    ("Shuri", GameColors.DARK_GREEN),
+                    ("Steve", GameColors.ORANGE),
+                    ("Chen", GameColors.BURGUNDY),
+                    ("Pylyp", GameColors.DARK_BLUE),
+                ]
             ],
         )
         self.player_controller = None
+        self.status_rect: pygame.Rect = None
+        self.overlay_rects: list[pygame.Rect] = []
+        self.lag = 0
+        self.mark_startup("init")
+
+    # the background, the font and the menus are loaded on first use; the menus are not drawn yet
+    @functools.cached_property
+    def bg(self) -> pygame.Surface:
+        return pygame.image.load("assets/grid.jpg").convert()
 
-    def buld_main_menu(self):
-        # self.mainmenu.add.text_input("Name: ", default="username", maxchar=20)
-        self.mainmenu.add.button("Play", self.go_to_action_phase)
-        self.mainmenu.add.button("Quit", pygame_menu.events.EXIT)
+    @functools.cached_property
+    def font(self) -> pygame.freetype.Font:
+        return pygame.freetype.SysFont("FantasqueSansM Nerd Font Propo", 15)
 
-    def build_action_phase(self):
-        # self.action_phase.add.image("assets/nbgrid.jpg")
-        self.action_phase.add.button("Back", self.back_to_main_menu)
+    @functools.cached_property
+    def mainmenu(self):
+        import pygame_menu
+
+        menu = pygame_menu.Menu("Litterally Pen Game", self.DIMX, self.DIMY, theme=pygame_menu.themes.THEME_BLUE)
+        self.buld_main_menu(menu)
+        return menu
+
+    @functools.cached_property
+    def action_phase(self):
+        import pygame_menu
+
+        menu = pygame_menu.Menu("Action Phase", self.DIMX, self.DIMY, theme=pygame_menu.themes.THEME_BLUE)
+        self.build_action_phase(menu)
+        return menu
+
+    def buld_main_menu(self, menu):
+        import pygame_menu
+
+        # menu.add.text_input("Name: ", default="username", maxchar=20)
+        menu.add.button("Play", self.go_to_action_phase)
+        menu.add.button("Quit", pygame_menu.events.EXIT)
+
+    def build_action_phase(self, menu):
+        # menu.add.image("assets/nbgrid.jpg")
+        menu.add.button("Back", self.back_to_main_menu)
         # self.action_phase_surface = pygame.Surface((300, 300))
-        # self.action_phase.add.surface(self.action_phase_surface, "ap_surface")
+        # menu.add.surface(self.action_phase_surface, "ap_surface")
         # self.action_phase_surface.blit(pygame.image.load("assets/grid.jpg"), (0, 0))
 
     def go_to_action_phase(self):
@@ -66,38 +134,131 @@ class Game:
         self.is_ap = False
         self.action_phase.close()
 
+    def mark_startup(self, name: str) -> None:
+        self.startup[name] = time.perf_counter() - self.started
+
+    def draw_status(self) -> pygame.Rect:
+        if not self.board.available_moves():
+            status = f"You lost {self.board.current_player}, no connections left"
+        else:
+            status = f"{self.board.current_player}'s turn, at most {self.board.reach().move_bound} moves left"
+
+        if self.status_rect:
+            self.board.restore(self.status_rect)
+        rect = self.font.render_to(self.surface, (10, 10), status)
+        dirty = rect.union(self.status_rect) if self.status_rect else rect
+        self.status_rect = rect
+        return dirty
+
+    def draw_overlay(self) -> list[pygame.Rect]:
+        dirty = self.overlay_rects
+        for rect in dirty:
+            self.board.restore(rect)
+        self.overlay_rects = [self.profiler.draw(self.surface, self.font, (10, 30))] if self.profiler.enabled else []
+        return dirty + self.overlay_rects
+
+    def load_record(self, record: GameRecord) -> None:
+        self.board = Board.from_record(
+            record, surface=self.surface, players=self.board.player_visuals[: record.players]
+        )
+        self.board.profiler = self.profiler
+
+    def save_record(self) -> None:
+        with open(self.RECORD_PATH, "ab") as out:
+            RecordWriter(out).write(self.board.record())
+
+    def ai_to_move(self) -> bool:
+        return bool(self.board.current_player.ai and self.board.available_moves())
+
+    def poll_events(self, mouse_pos: tuple, now: int) -> list[pygame.event.Event]:
+        # block instead of spinning when there is no input, no AI move pending and nothing on screen would change
+        events = pygame.event.get()
+        if events or self.ai_to_move() or self.board.needs_redraw(mouse_pos, now):
+            return events
+        wait = self.board.ms_to_next_frame(now)
+        event = pygame.event.wait(self.IDLE_WAIT_MS if wait is None else min(wait, self.IDLE_WAIT_MS))
+        return [event] + pygame.event.get() if event.type != pygame.NOEVENT else []
+
+    def update(self) -> bool:
+        # the position the AI answers must have been on screen, otherwise a human move and the reply appear together
+        if self.board.drawn_version != self.board.state.version:
+            return False
+        return self.board.play_ai_turn()
+
+    def quit(self):
+        self.profiler.dump()
+        exit()
+
     def mainloop(self):
 
         while True:
             # self.surface.blit(pygame.transform.scale_by(self.bg, 0.4), (0, 0))
-            self.surface.fill((255, 255, 255))
-            if not self.board.available_moves():
-                self.font.render_to(
-                    self.surface, (10, 10), f"You lost {self.board.current_player}, no connections left"
-                )
-            else:
-                self.font.render_to(self.surface, (10, 10), f"{self.board.current_player}'s turn")
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    next_connection = self.board.pick_next_by_mouse(pygame.mouse.get_pos())
-                    if next_connection and next_connection.from_head:
-                        self.board.connect_head(next_connection)
-                    elif next_connection and next_connection.from_tail:
-                        self.board.connect_tail(next_connection)
-
-                if event.type == pygame.MOUSEBUTTONUP:
-                    self.board.pick_next_by_mouse(pygame.mouse.get_pos())
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        self.board = self.board.flush()
-                        self.surface.fill((255, 255, 255))
-                        pygame.display.flip()
-                    if event.key == pygame.K_0:
-                        self.board.random_simulation()
-
-            self.board.draw()
+            mouse_pos = pygame.mouse.get_pos()
+            # an idle wait inside poll_events is not event handling, so it stays out of the timed phase
+            events = self.poll_events(mouse_pos, pygame.time.get_ticks())
+            with self.profiler.phase("events"):
+                for event in events:
+                    if event.type == pygame.QUIT:
+                        self.quit()
+                    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and not self.board.current_player.ai:
+                        next_connection = self.board.pick_next_by_mouse(event.pos)
+                        if next_connection and next_connection.from_head:
+                            self.board.connect_head(next_connection)
+                        elif next_connection and next_connection.from_tail:
+                            self.board.connect_tail(next_connection)
+
+                    if event.type == pygame.VIDEORESIZE:
+                        self.board.relayout()
+                    if event.type == pygame.MOUSEWHEEL:
+                        self.board.zoom_at(
+                            mouse_pos,
+                            zoom=min(max(self.board.zoom * 1.1**event.y, self.MIN_ZOOM), self.board.max_zoom),
+                        )
+                    if event.type == pygame.MOUSEMOTION and (event.buttons[1] or event.buttons[2]):
+                        self.board.pan_by(event.rel)
+                    if event.type == pygame.MOUSEBUTTONUP:
+                        self.board.pick_next_by_mouse(event.pos)
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_SPACE:
+                            self.board = self.board.flush()
+                        if event.key == pygame.K_0:
+                            self.board.random_simulation()
+                        if event.key == pygame.K_u:
+                            self.board.undo_move()
+                            while self.board.history and self.board.current_player.ai:
+                                self.board.undo_move()
+                        if event.key == pygame.K_r:
+                            self.board.reset()
+                        if event.key == pygame.K_s:
+                            self.save_record()
+                        if event.key == pygame.K_h:
+                            self.board.heatmap = not self.board.heatmap
+                        if event.key in self.PAN_KEYS:
+                            dx, dy = self.PAN_KEYS[event.key]
+                            width, height = self.surface.get_size()
+                            self.board.pan_by((dx * width * self.PAN_STEP, dy * height * self.PAN_STEP))
+                        if event.key == pygame.K_F3:
+                            self.profiler.toggle()
+                        if event.key == pygame.K_F4:
+                            self.profiler.dump()
+
+            # simulation runs in fixed ticks; an AI move ends the catch-up so it is shown before the next one
+            self.lag = min(self.lag, self.TICK_MS * self.MAX_TICKS_PER_FRAME)
+            with self.profiler.phase("ai"):
+                while self.lag >= self.TICK_MS:
+                    self.lag -= self.TICK_MS
+                    if self.update():
+                        self.lag = 0
+
+            mouse_pos = pygame.mouse.get_pos()
+            now = pygame.time.get_ticks()
+            if not self.board.needs_redraw(mouse_pos, now) and not self.profiler.enabled:
+                self.lag += self.clock.tick(self.FPS)
+                continue
+            with self.profiler.phase("draw"):
+                dirty = self.board.draw(mouse_pos, now)
+            dirty.append(self.draw_status())
+            dirty += self.draw_overlay()
 
             # for i, chunk in enumerate(
             #     [self.board.avaialable_moves()[i : i + 8] for i in range(0, len(self.board.avaialable_moves()), 8)],
@@ -113,5 +274,11 @@ class Game:
             #     self.action_phase.draw(self.surface)
             #     self.action_phase.update(events)
 
-            pygame.display.flip()
-            self.clock.tick(120)
+            with self.profiler.phase("display"):
+                pygame.display.update(dirty)
+            if "first_frame" not in self.startup:
+                self.mark_startup("first_frame")
+                self.on_startup(self.startup)
+            frame_ms = self.clock.tick(self.FPS)
+            self.lag += frame_ms
+            self.profiler.end_frame(frame_ms)
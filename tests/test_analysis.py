@@ -0,0 +1,79 @@
+import random
+from collections import deque
+
+import pytest
+
+from src.logic.core.analysis import decided_loser, reach, regions
+from src.logic.core.state import GameState, iter_bits
+
+
+def bfs(state: GameState, seeds: int) -> int:
+    # the flood on coordinates: eight neighbours, empty cells only
+    width, height, empty = state.width, state.height, state.empty
+    reached = {cell for cell in iter_bits(seeds) if empty >> cell & 1}
+    queue = deque(reached)
+    while queue:
+        y, x = divmod(queue.popleft(), width)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                nx, ny = x + dx, y + dy
+                cell = ny * width + nx
+                if 0 <= nx < width and 0 <= ny < height and empty >> cell & 1 and cell not in reached:
+                    reached.add(cell)
+                    queue.append(cell)
+    return sum(1 << cell for cell in reached)
+
+
+def outcomes(state: GameState) -> tuple[set[int], int]:
+    """Every loser and the longest number of moves over all ways to finish the game."""
+    if state.is_over:
+        return {state.loser}, 0
+    losers, longest = set(), 0
+    for move in state.legal_moves():
+        record = state.apply_move(move)
+        found, length = outcomes(state)
+        state.undo_move(record)
+        losers |= found
+        longest = max(longest, length + 1)
+    return losers, longest
+
+
+def random_positions(seed: int, count: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        state = GameState.random(
+            rng.randint(1, 5), rng.randint(1, 5), wall_density=rng.random() * 0.3, players=rng.randint(2, 3), rng=rng
+        )
+        while not state.is_over:
+            yield state
+            state.apply_move(rng.choice(state.legal_moves()))
+        yield state
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reach_matches_bfs(seed):
+    for state in random_positions(seed, 40):
+        found = reach(state)
+        assert found.head == bfs(state, state.head_targets)
+        assert found.tail == bfs(state, state.tail_targets)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_regions_partition_empty_cells(seed):
+    for state in random_positions(seed, 40):
+        found = regions(state.empty, state.width, state.height)
+        assert sum(found) == state.empty
+        assert all(a & b == 0 for i, a in enumerate(found) for b in found[i + 1 :])
+        assert all(bfs(state, region & -region) == region for region in found)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_move_bound_and_decided_loser_against_search(seed):
+    for state in random_positions(seed, 60):
+        if state.empty.bit_count() > 8:
+            continue
+        losers, longest = outcomes(state)
+        assert longest <= reach(state).move_bound
+        loser = decided_loser(state)
+        if loser is not None:
+            assert losers == {loser}
@@ -0,0 +1,85 @@
+import io
+import os
+import random
+from dataclasses import replace
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+from src.logic.core.board import Board  # noqa: E402
+from src.logic.core.record import GameRecord, RecordWriter, parse_record, read_records  # noqa: E402
+from src.logic.core.state import DIRECTION_DELTAS, TAIL, GameState  # noqa: E402
+from src.logic.core.utils import Point  # noqa: E402
+
+
+def play(seed: int, width: int = 5, height: int = 4, players: int = 2) -> tuple[GameState, list[int]]:
+    rng = random.Random(seed)
+    state = GameState.random(width, height, wall_density=0.15, players=players, rng=rng)
+    moves = []
+    while legal := state.legal_moves():
+        moves.append(rng.choice(legal))
+        state.apply_move(moves[-1])
+    return state, moves
+
+
+def tail_first_record() -> GameRecord:
+    # head and tail share the anchor at ply 0, so the first move is played from the tail
+    state = GameState(4, 4, Point(1, 1))
+    return GameRecord.from_moves(state, [state.legal_moves()[0] | TAIL, (state.head_cell + 1) << 1])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bytes_round_trip(seed):
+    state, moves = play(seed, players=2 + seed % 3)
+    record = GameRecord.from_moves(state, moves, seed=seed)
+    parsed, end = parse_record(record.to_bytes())
+    assert parsed == record
+    assert end == len(record.to_bytes())
+    assert list(parsed.moves()) == moves
+    final = parsed.final_state()
+    assert (final.connected, final.planes, final.head_cell, final.tail_cell) == (
+        state.connected,
+        state.planes,
+        state.head_cell,
+        state.tail_cell,
+    )
+
+
+def test_stream_of_records():
+    records = [GameRecord.from_moves(*play(seed), seed=seed) for seed in range(10)]
+    out = io.BytesIO()
+    writer = RecordWriter(out)
+    for record in records[:5]:
+        writer.write(record)
+    for record in records[5:]:
+        writer.begin(record.initial_state(), record.seed)
+        for move in record.moves():
+            writer.add(move)
+        writer.end()
+    out.seek(0)
+    assert list(read_records(out, chunk_size=7)) == records
+
+
+def test_truncated_and_illegal_records():
+    data = GameRecord.from_moves(*play(1)).to_bytes()
+    with pytest.raises(ValueError):
+        list(read_records(io.BytesIO(data[:-1])))
+    # leaving the board to the left of a corner anchor
+    record = replace(GameRecord.setup(GameState(4, 4, Point(0, 0))), codes=bytes([DIRECTION_DELTAS.index((-1, 0))]))
+    with pytest.raises(ValueError):
+        list(record.moves())
+
+
+def test_tail_move_at_ply_zero():
+    record = tail_first_record()
+    state = record.final_state()
+    assert state.ply == 2 and state.head_cell != state.tail_cell
+
+    pygame.display.init()
+    board = Board.from_record(record, pygame.Surface((600, 800)))
+    assert board.record().codes == record.codes
+    assert (board.state.head_cell, board.state.tail_cell) == (state.head_cell, state.tail_cell)
+    assert board.head.coords == state.head and board.tail.coords == state.tail
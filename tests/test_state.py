@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from src.logic.core.state import TAIL, GameState, iter_bits
+from src.logic.core.utils import Point
+
+SLOTS = ("walls", "connected", "planes", "head_cell", "tail_cell", "head_targets", "tail_targets", "current_player")
+
+
+class Reference:
+    """The rules spelled out on coordinates and a set of links, to check the bitboards against."""
+
+    def __init__(self, state: GameState):
+        self.width, self.height = state.width, state.height
+        self.walls = {(cell % state.width, cell // state.width) for cell in iter_bits(state.walls)}
+        self.head = self.tail = (state.anchor.x, state.anchor.y)
+        self.connected = {self.head}
+        self.links: set[frozenset] = set()
+
+    def targets(self, start: tuple[int, int]) -> set[tuple[int, int]]:
+        found = set()
+        sx, sy = start
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                end = ex, ey = sx + dx, sy + dy
+                if (dx, dy) == (0, 0) or not (0 <= ex < self.width and 0 <= ey < self.height):
+                    continue
+                if end in self.walls or end in self.connected:
+                    continue
+                # a diagonal may not cross the other diagonal of the same 2x2 box
+                if dx and dy and frozenset({(sx, ey), (ex, sy)}) in self.links:
+                    continue
+                found.add(end)
+        return found
+
+    def moves(self) -> set[tuple[bool, tuple[int, int]]]:
+        moves = {(True, end) for end in self.targets(self.head)}
+        if self.tail != self.head:
+            moves |= {(False, end) for end in self.targets(self.tail)}
+        return moves
+
+    def play(self, from_head: bool, end: tuple[int, int]) -> None:
+        self.links.add(frozenset({self.head if from_head else self.tail, end}))
+        self.connected.add(end)
+        if from_head:
+            self.head = end
+        else:
+            self.tail = end
+
+
+def random_state(rng: random.Random) -> GameState:
+    width, height = rng.randint(1, 7), rng.randint(1, 7)
+    return GameState.random(width, height, wall_density=rng.choice([0, 0.1, 0.3]), players=rng.randint(1, 4), rng=rng)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_legal_moves_match_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        state = random_state(rng)
+        reference = Reference(state)
+        while True:
+            legal = state.legal_moves()
+            point = state.point
+            assert len(set(legal)) == len(legal)
+            assert {(not move & TAIL, point(move >> 1).tuple) for move in legal} == reference.moves()
+            assert all(state.is_legal(move) for move in legal)
+            if not legal:
+                break
+            move = rng.choice(legal)
+            reference.play(not move & TAIL, point(move >> 1).tuple)
+            state.apply_move(move)
+        assert state.is_over
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (1, 5), (5, 1), (2, 2), (4, 3)])
+def test_every_anchor(width, height):
+    # corners and edges included: no move may wrap around a row or leave the board
+    for cell in range(width * height):
+        state = GameState(width, height, Point(cell % width, cell // width))
+        reference = Reference(state)
+        assert {(True, state.point(move >> 1).tuple) for move in state.legal_moves()} == reference.moves()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_apply_undo_round_trip(seed):
+    rng = random.Random(seed)
+    state = random_state(rng)
+    snapshots, records = [], []
+    while legal := state.legal_moves():
+        move = rng.choice(legal)
+        snapshots.append(state.copy())
+        code = state.move_code(move)
+        assert state.move_from_code(code) == move
+        records.append(state.apply_move(move))
+    versions = [state.version]
+    while records:
+        state.undo_move(records.pop())
+        before = snapshots.pop()
+        assert all(getattr(state, slot) == getattr(before, slot) for slot in SLOTS)
+        assert state.ply == before.ply
+        versions.append(state.version)
+    # undo never reuses a version
+    assert versions == sorted(set(versions))
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from src.logic.core.state import GameState
+from src.logic.core.symmetry import Symmetry, canonical, restore_move, symmetries, transform_mask, transform_move
+from src.logic.core.utils import Point
+
+
+def image_state(state: GameState, symmetry: Symmetry) -> GameState:
+    image = GameState(symmetry.width, symmetry.height, Point(0, 0), players=state.players)
+    image.walls = transform_mask(state.walls, symmetry.cells)
+    image.connected = transform_mask(state.connected, symmetry.cells)
+    image.planes = [0, 0, 0, 0]
+    for links, (target, bits) in zip(state.planes, symmetry.planes):
+        image.planes[target] = transform_mask(links, bits)
+    image.head_cell = symmetry.cells[state.head_cell]
+    image.tail_cell = symmetry.cells[state.tail_cell]
+    image.current_player = state.current_player
+    image.head_targets = image.targets(image.head_cell)
+    image.tail_targets = image.targets(image.tail_cell)
+    return image
+
+
+def random_position(rng: random.Random, width: int, height: int) -> GameState:
+    state = GameState.random(width, height, wall_density=rng.random() * 0.3, rng=rng)
+    for _ in range(rng.randint(0, width * height)):
+        if state.is_over:
+            break
+        state.apply_move(rng.choice(state.legal_moves()))
+    return state
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (1, 4), (3, 3), (4, 4), (5, 3), (2, 6)])
+def test_symmetries_are_permutations(width, height):
+    found = symmetries(width, height)
+    assert len(found) == 8
+    for symmetry in found:
+        assert sorted(symmetry.cells) == list(range(width * height))
+        assert all(symmetry.inverse[image] == cell for cell, image in enumerate(symmetry.cells))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_images_share_the_key(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        state = random_position(rng, rng.randint(1, 6), rng.randint(1, 6))
+        key, _ = canonical(state)
+        legal = state.legal_moves()
+        for symmetry in symmetries(state.width, state.height):
+            image = image_state(state, symmetry)
+            assert canonical(image)[0] == key
+            # the rules commute with the symmetry, so legal moves map onto legal moves
+            assert sorted(transform_move(move, symmetry) for move in legal) == sorted(image.legal_moves())
+            assert [restore_move(transform_move(move, symmetry), symmetry) for move in legal] == legal
+
+
+def test_different_positions_have_different_keys():
+    rng = random.Random(0)
+    keys = {}
+    for _ in range(300):
+        state = random_position(rng, 4, 3)
+        key, _ = canonical(state)
+        images = {
+            (image.walls, image.connected, tuple(image.planes), image.head_cell, image.tail_cell)
+            for image in (image_state(state, symmetry) for symmetry in symmetries(4, 3))
+            if (image.width, image.height) == (4, 3)
+        }
+        assert keys.setdefault(key, images) == images